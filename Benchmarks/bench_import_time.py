@@ -0,0 +1,71 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+# Directory of the analysis modules
+PY_FILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Py files")
+
+# Modules whose cold import time is measured
+MODULES = ["functions_vanguard", "analysis_vanguard", "sessions_vanguard", "incremental_vanguard", "Main"]
+
+# Packages that must not be loaded by a plain import of the modules
+HEAVY_MODULES = ["matplotlib", "seaborn", "scipy.stats", "statsmodels", "numba"]
+
+# Target cold import time of each module, in seconds
+TARGET_SECONDS = 1.0
+
+# Code run in a fresh interpreter to time one import
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def time_import(module, repeat=5):
+    """
+    This function measures the cold import time of a module, each time in a fresh interpreter.
+
+    Parameters:
+    module (str): The name of the module.
+    repeat (int): The number of fresh interpreters to run (default is 5).
+
+    Returns:
+    tuple: The median import time in seconds and the heavy packages the import loaded.
+    """
+    timings = []
+    for _ in range(repeat):
+        code = IMPORT_SNIPPET.format(path=PY_FILES_DIR, module=module, heavy=HEAVY_MODULES)
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        elapsed, loaded = output.split()[0], output.split()[1:]
+        timings.append(float(elapsed))
+
+    return statistics.median(timings), loaded[0].split(",") if loaded else []
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold import time of the analysis modules.")
+    parser.add_argument("--target", type=float, default=TARGET_SECONDS, help="maximum import time in seconds")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in MODULES:
+        elapsed, loaded = time_import(module, args.repeat)
+        ok = elapsed <= args.target and not loaded
+        failed |= not ok
+        status = "ok" if ok else "FAIL"
+        heavy = f" (loaded {', '.join(loaded)})" if loaded else ""
+        print(f"{module:<24} {elapsed:6.3f} s  {status}{heavy}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import matplotlib
+matplotlib.use("Agg")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "Py files"))
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import analysis_vanguard as an
+import compact_vanguard as cp
+import funnel_vanguard as fn
+import parallel_vanguard as pl
+import functions_vanguard as vd
+import sessions_vanguard as sv
+import suite_vanguard as su
+import synthetic_vanguard as synthetic
+from bench_import_time import time_import
+
+
+# Default directory of the stored results
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Default dataset sizes, in events
+DEFAULT_SIZES = [10**4, 10**5, 10**6]
+
+# Relative slowdown or memory growth reported as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Stages faster than this are too noisy to compare, in seconds
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+def measure(func, *args, memory=True):
+    """
+    This function runs one stage of the pipeline and measures it. The stage runs once to be timed and,
+    when memory is requested, a second time under tracemalloc for its peak allocation, so the tracing
+    overhead does not distort the timing. Printed output and figures of the stage are discarded.
+
+    Parameters:
+    func (callable): The stage.
+    *args: The arguments of the stage.
+    memory (bool): Whether to measure the peak memory (default is True).
+
+    Returns:
+    tuple: The result of the stage, its time in seconds and its peak memory in MB (None if not measured).
+    """
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            output = func(*args)
+        plt.close("all")
+        return output
+
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        run()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    return result, seconds, peak_mb
+
+def load_dataset(n_events, seed=0, from_files=True):
+    """
+    This function builds a synthetic dataset of the given size, either by writing and reading back
+    the text files (so that reading them is benchmarked too) or directly in memory.
+
+    Parameters:
+    n_events (int): The approximate number of events.
+    seed (int): The seed of the generator (default is 0).
+    from_files (bool): Whether to go through the text files (default is True).
+
+    Returns:
+    tuple: The cleaned client profiles, the experiment roster, and either the paths of the web footprint
+    files or the web footprint shards.
+    """
+    n_clients = max(10, min(70_609, n_events // 10))
+    if from_files:
+        out_dir = os.path.join(tempfile.gettempdir(), f"vanguard_bench_{n_events}_{seed}")
+        if not os.path.exists(os.path.join(out_dir, "df_final_web_data_pt_2.txt")):
+            synthetic.write_dataset(out_dir, n_events, n_clients, n_shards=2, seed=seed)
+        demo = pd.read_csv(os.path.join(out_dir, "df_final_demo.txt"))
+        roster = pd.read_csv(os.path.join(out_dir, "df_final_experiment_clients.txt"))
+        web_data = [os.path.join(out_dir, f"df_final_web_data_pt_{shard}.txt") for shard in (1, 2)]
+    else:
+        demo = synthetic.generate_demo(n_clients, seed)
+        roster = synthetic.generate_experiment_clients(demo, seed)
+        events = synthetic.generate_web_data(n_events, demo['client_id'], seed)
+        events['client_id'] = events['client_id'].astype('int32')
+        half = len(events) // 2
+        web_data = [events.iloc[:half], events.iloc[half:]]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        demo = vd.clean_dataframe(demo)
+
+    return demo, roster, web_data
+
+def run_pipeline(n_events, seed=0, from_files=True, memory=True):
+    """
+    This function runs and measures every stage of the analysis on one synthetic dataset.
+
+    Parameters:
+    n_events (int): The approximate number of events.
+    seed (int): The seed of the generator (default is 0).
+    from_files (bool): Whether to benchmark reading the text files (default is True).
+    memory (bool): Whether to measure the peak memory of each stage (default is True).
+
+    Returns:
+    list of dict: The n_events, stage, seconds and peak_mb of each stage.
+    """
+    demo, roster, web_data = load_dataset(n_events, seed, from_files)
+    results = []
+
+    def stage(name, func, *args):
+        output, seconds, peak_mb = measure(func, *args, memory=memory)
+        results.append({'n_events': n_events, 'stage': name, 'seconds': seconds, 'peak_mb': peak_mb})
+        print(f"{n_events:>11,} {name:<36} {seconds:9.3f} s" + (f" {peak_mb:10.1f} MB" if memory else ""))
+        return output
+
+    if from_files:
+        web_data = [stage(f"import_web_data (pt_{number})", vd.import_web_data, path)
+                    for number, path in enumerate(web_data, start=1)]
+
+    merged = stage("merge_dataframes", lambda: vd.merge_dataframes(*web_data, sort_by="visit"))
+    variation_df = stage("merge_and_clean_dataframes", vd.merge_and_clean_dataframes, demo, merged, roster)
+    timed_df, _ = stage("analyze_time_spent", vd.analyze_time_spent, variation_df)
+    stage("analyze_error_rates", vd.analyze_error_rates, timed_df)
+    stage("analyze_session_durations", vd.analyze_session_durations, timed_df)
+    completion_data, _, _ = stage("analyze_completion_rates", vd.analyze_completion_rates, timed_df)
+    stage("analyze_cost_effectiveness", vd.analyze_cost_effectiveness, timed_df, completion_data)
+    stage("analyze_session_durations_by_step", vd.analyze_session_durations_by_step, timed_df)
+    sessions = stage("sessionize", sv.sessionize, variation_df)
+    stage("funnel", fn.funnel, variation_df)
+    stage("analyze_experiment (sessions)", an.analyze_experiment, None, sessions)
+    stage("run_suite (process pool)", su.run_suite, None, sessions)
+    stage("analyze_parallel (visit shards)", pl.analyze_parallel, variation_df)
+    compact = stage("compact_experiment", cp.compact_experiment, demo, merged, roster)
+    stage("sessionize (compact)", cp.sessionize, compact)
+
+    return results
+
+def git_commit():
+    """
+    This function returns the current git commit of the repository, or None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(results, results_dir=RESULTS_DIR):
+    """
+    This function stores the benchmark results with the environment they were measured in.
+
+    Parameters:
+    results (list of dict): The measurements.
+    results_dir (str): The directory of the results.
+
+    Returns:
+    str: The path of the results file.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(results_dir, f"bench_{stamp}.json")
+    meta = {
+        'timestamp': stamp,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+    }
+    with open(path, "w") as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+
+    return path
+
+def compare_results(results, baseline_path, tolerance=DEFAULT_TOLERANCE):
+    """
+    This function compares the results with stored baseline results of the same stages and sizes.
+
+    Parameters:
+    results (list of dict): The measurements.
+    baseline_path (str): The path of the baseline results file.
+    tolerance (float): The relative slowdown or memory growth allowed (default is 25%).
+
+    Returns:
+    list of str: A description of each regression.
+    """
+    with open(baseline_path) as f:
+        baseline = {(row['n_events'], row['stage']): row for row in json.load(f)['results']}
+
+    regressions = []
+    for row in results:
+        old = baseline.get((row['n_events'], row['stage']))
+        if old is None:
+            continue
+        if old['seconds'] >= MIN_COMPARABLE_SECONDS and row['seconds'] > old['seconds'] * (1 + tolerance):
+            regressions.append(f"{row['stage']} at {row['n_events']:,} events: "
+                               f"{old['seconds']:.3f} s -> {row['seconds']:.3f} s")
+        if old.get('peak_mb') and row['peak_mb'] and row['peak_mb'] > old['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{row['stage']} at {row['n_events']:,} events: "
+                               f"{old['peak_mb']:.1f} MB -> {row['peak_mb']:.1f} MB")
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and memory-profile each stage of the analysis on synthetic data.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES,
+                        help="numbers of events, from 1e4 to 1e8")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-memory", action="store_true", help="skip writing and reading the text files")
+    parser.add_argument("--no-memory", action="store_true", help="only time the stages")
+    parser.add_argument("--compare", help="baseline results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    args = parser.parse_args(argv)
+
+    # Cold import of the analysis module, in a fresh interpreter
+    import_seconds, _ = time_import("functions_vanguard")
+    results = [{'n_events': 0, 'stage': "import functions_vanguard", 'seconds': import_seconds, 'peak_mb': None}]
+    print(f"{'':>11} {'import functions_vanguard':<36} {import_seconds:9.3f} s")
+
+    for n_events in args.sizes:
+        results += run_pipeline(int(n_events), args.seed, not args.in_memory, not args.no_memory)
+
+    path = save_results(results, args.results_dir)
+    print(f"Results saved to {path}")
+
+    if args.compare:
+        regressions = compare_results(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
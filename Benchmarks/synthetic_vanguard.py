@@ -0,0 +1,248 @@
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+# Steps of the online process, in order
+STEPS = ['start', 'step_1', 'step_2', 'step_3', 'confirm']
+
+# Probability of going back one step, staying on the step and going forward one step
+STEP_MOVES = (0.12, 0.18, 0.70)
+
+# Mean number of events per visit before it is cut at "confirm", and the longest visit generated
+MEAN_VISIT_EVENTS = 6
+MAX_VISIT_EVENTS = 40
+
+# Lower bound of the mean number of events per visit once cut, used to size the chunks
+MIN_MEAN_VISIT_EVENTS = 3
+
+# Period of the experiment
+EXPERIMENT_START = pd.Timestamp('2017-03-15')
+EXPERIMENT_END = pd.Timestamp('2017-06-20')
+
+# Visits generated per chunk, which bounds the memory used by the generator
+VISITS_PER_CHUNK = 1_000_000
+
+
+def generate_demo(n_clients, seed=0):
+    """
+    This function generates client profiles with the columns and value ranges of df_final_demo.
+
+    Parameters:
+    n_clients (int): The number of clients.
+    seed (int): The seed of the random generator (default is 0).
+
+    Returns:
+    pd.DataFrame: The client profiles.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Unique client ids in the range of the real ones
+    client_id = rng.choice(10_000_000, size=n_clients, replace=False).astype(np.int64)
+    tenure_mnth = rng.integers(33, 750, size=n_clients).astype(float)
+    age = np.round(rng.uniform(13.5, 96.0, size=n_clients) * 2) / 2
+    calls = rng.integers(0, 8, size=n_clients).astype(float)
+
+    demo = pd.DataFrame({
+        'client_id': client_id,
+        'clnt_tenure_yr': tenure_mnth // 12,
+        'clnt_tenure_mnth': tenure_mnth,
+        'clnt_age': age,
+        'gendr': rng.choice(['M', 'F', 'U', 'X'], size=n_clients, p=[0.35, 0.33, 0.319, 0.001]),
+        'num_accts': rng.choice([1.0, 2.0, 3.0, 4.0, 5.0], size=n_clients, p=[0.05, 0.78, 0.14, 0.02, 0.01]),
+        'bal': np.round(rng.lognormal(11.3, 1.2, size=n_clients), 2),
+        'calls_6_mnth': calls,
+        'logons_6_mnth': calls + 3,
+    })
+
+    # A few profiles have missing values, like the real file
+    missing = rng.random(n_clients) < 0.0002
+    demo.loc[missing, ['clnt_age', 'bal']] = np.nan
+
+    return demo
+
+def generate_experiment_clients(demo, seed=0):
+    """
+    This function generates the experiment roster of df_final_experiment_clients: most clients
+    are split between Control and Test, and the others have no Variation.
+
+    Parameters:
+    demo (pd.DataFrame): The client profiles.
+    seed (int): The seed of the random generator (default is 0).
+
+    Returns:
+    pd.DataFrame: The roster with the 'client_id' and 'Variation' columns.
+    """
+    rng = np.random.default_rng(seed + 1)
+
+    variation = rng.choice(np.array(['Test', 'Control', None], dtype=object), size=len(demo), p=[0.37, 0.33, 0.30])
+
+    return pd.DataFrame({'client_id': demo['client_id'].to_numpy(), 'Variation': variation})
+
+def _visit_steps(rng, lengths):
+    """
+    This function generates the step codes of visits as a random walk over the process steps,
+    one event position at a time for all visits at once. A visit ends once it reaches "confirm".
+
+    Parameters:
+    rng (np.random.Generator): The random generator.
+    lengths (np.ndarray): The longest number of events of each visit.
+
+    Returns:
+    tuple: The int8 step codes of the events, visit after visit, and the number of events of each visit.
+    """
+    n_visits, max_length = len(lengths), lengths.max()
+    steps = np.zeros((n_visits, max_length), dtype=np.int8)
+
+    # Most visits begin on the start page, some resume later in the process
+    steps[:, 0] = rng.choice(5, size=n_visits, p=[0.85, 0.06, 0.04, 0.03, 0.02])
+    for position in range(1, max_length):
+        move = rng.choice([-1, 0, 1], size=n_visits, p=STEP_MOVES).astype(np.int8)
+        steps[:, position] = np.clip(steps[:, position - 1] + move, 0, 4)
+
+    # End each visit at its first "confirm"
+    is_confirm = steps == 4
+    first_confirm = np.where(is_confirm.any(axis=1), is_confirm.argmax(axis=1) + 1, max_length)
+    lengths = np.minimum(lengths, first_confirm)
+
+    # Keep the first 'length' events of each visit
+    return steps[np.arange(max_length) < lengths[:, None]], lengths
+
+def generate_web_data_chunks(n_events, client_ids, seed=0, shuffle=True):
+    """
+    This function generates web footprint events with the columns of df_final_web_data,
+    in chunks of at most VISITS_PER_CHUNK visits so that 10^8 events can be produced
+    without holding them all in memory.
+
+    Every visit belongs to one client and visitor, walks through the process steps with realistic
+    backtracks, and has increasing timestamps with heavy-tailed gaps between events.
+
+    Parameters:
+    n_events (int): The approximate total number of events.
+    client_ids (np.ndarray): The client ids the visits are drawn from.
+    seed (int): The seed of the random generator (default is 0).
+    shuffle (bool): Whether to shuffle the rows of each chunk, like the real files (default is True).
+
+    Yields:
+    pd.DataFrame: A chunk of events, with 'visitor_id' and 'visit_id' as categoricals
+    and 'date_time' as datetime64.
+    """
+    rng = np.random.default_rng(seed + 2)
+    client_ids = np.asarray(client_ids)
+    window = (EXPERIMENT_END - EXPERIMENT_START).value
+
+    first_visit, n_generated = 0, 0
+    while n_generated < n_events:
+        # Number of events and steps of each visit, keeping the visits that fit in the remaining events
+        remaining = n_events - n_generated
+        size = min(VISITS_PER_CHUNK, -(-remaining // MIN_MEAN_VISIT_EVENTS))
+        lengths = np.minimum(rng.geometric(1 / MEAN_VISIT_EVENTS, size=size), MAX_VISIT_EVENTS)
+        steps, lengths = _visit_steps(rng, lengths)
+        fits = np.cumsum(lengths) <= remaining
+        fits[0] = True
+        size = int(fits.sum())
+        lengths = lengths[:size]
+        steps = steps[:lengths.sum()]
+        visit_of_event = np.repeat(np.arange(size), lengths)
+
+        # Client and visitor of each visit
+        clients = rng.choice(client_ids, size=size)
+        visit_numbers = np.arange(first_visit, first_visit + size)
+        visitor_ids = pd.Series(clients).astype(str) + '_' + pd.Series(clients % 997 * 1_000_003 + 17).astype(str)
+        visitor_codes, visitors = pd.factorize(visitor_ids)
+        visit_ids = (pd.Series(visit_numbers * 7919 % 99_999_989).astype(str) + '_'
+                     + pd.Series(rng.integers(10**9, 10**10, size=size)).astype(str) + '_'
+                     + pd.Series(visit_numbers % 999_983).astype(str))
+
+        # Timestamps: a visit start plus cumulative gaps of a few seconds to several minutes
+        gaps = np.minimum(rng.lognormal(3.8, 1.1, size=len(steps)), 3600).astype(np.int64) + 1
+        starts_of_visits = np.cumsum(lengths) - lengths
+        gaps[starts_of_visits] = 0
+        offsets = np.cumsum(gaps) - np.repeat(np.cumsum(gaps)[starts_of_visits], lengths)
+        start_times = EXPERIMENT_START.value + rng.integers(0, window, size=size) // 10**9 * 10**9
+        times = np.repeat(start_times, lengths) + offsets * 10**9
+
+        chunk = pd.DataFrame({
+            'client_id': np.repeat(clients, lengths),
+            'visitor_id': pd.Categorical.from_codes(visitor_codes[visit_of_event], categories=visitors),
+            'visit_id': pd.Categorical.from_codes(visit_of_event, categories=visit_ids),
+            'process_step': pd.Categorical.from_codes(steps, categories=STEPS),
+            'date_time': pd.to_datetime(times),
+        })
+        if shuffle:
+            chunk = chunk.iloc[rng.permutation(len(chunk))].reset_index(drop=True)
+
+        yield chunk
+        first_visit += size
+        n_generated += len(chunk)
+
+def generate_web_data(n_events, client_ids, seed=0, shuffle=True):
+    """
+    This function generates web footprint events in one DataFrame.
+
+    Parameters:
+    n_events (int): The approximate total number of events.
+    client_ids (np.ndarray): The client ids the visits are drawn from.
+    seed (int): The seed of the random generator (default is 0).
+    shuffle (bool): Whether to shuffle the rows, like the real files (default is True).
+
+    Returns:
+    pd.DataFrame: The events.
+    """
+    chunks = list(generate_web_data_chunks(n_events, client_ids, seed, shuffle))
+    if len(chunks) == 1:
+        return chunks[0]
+
+    # Chunks have their own visit and visitor categories, so union them
+    columns = {}
+    for column in chunks[0].columns:
+        parts = [chunk[column] for chunk in chunks]
+        if column in ('visitor_id', 'visit_id'):
+            columns[column] = pd.Series(union_categoricals(parts))
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+
+    return pd.DataFrame(columns)
+
+def write_dataset(out_dir, n_events, n_clients=None, n_shards=2, seed=0):
+    """
+    This function writes a synthetic dataset with the file names and formats of the real one:
+    df_final_demo.txt, df_final_experiment_clients.txt and df_final_web_data_pt_N.txt.
+
+    Parameters:
+    out_dir (str): The directory of the files.
+    n_events (int): The approximate total number of events.
+    n_clients (int): The number of clients (default is one client per 10 events, at most 70,609 like the real data).
+    n_shards (int): The number of web footprint files (default is 2).
+    seed (int): The seed of the random generator (default is 0).
+
+    Returns:
+    dict: The paths of the 'demo', 'experiment_clients' and 'web_data' files.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if n_clients is None:
+        n_clients = max(10, min(70_609, n_events // 10))
+
+    demo = generate_demo(n_clients, seed)
+    roster = generate_experiment_clients(demo, seed)
+    paths = {
+        'demo': os.path.join(out_dir, "df_final_demo.txt"),
+        'experiment_clients': os.path.join(out_dir, "df_final_experiment_clients.txt"),
+        'web_data': [os.path.join(out_dir, f"df_final_web_data_pt_{shard + 1}.txt") for shard in range(n_shards)],
+    }
+    demo.to_csv(paths['demo'], index=False)
+    roster.to_csv(paths['experiment_clients'], index=False)
+
+    # Spread the chunks of events over the shards, appending to each file
+    for path in paths['web_data']:
+        if os.path.exists(path):
+            os.remove(path)
+    for number, chunk in enumerate(generate_web_data_chunks(n_events, demo['client_id'], seed)):
+        for shard, part in enumerate(np.array_split(np.arange(len(chunk)), n_shards)):
+            path = paths['web_data'][shard]
+            chunk.iloc[part].to_csv(path, mode='a', header=number == 0, index=False,
+                                    date_format='%Y-%m-%d %H:%M:%S')
+
+    return paths
@@ -1,37 +1,72 @@
+import os
+import analysis_vanguard as an
 import functions_vanguard as vd
-import pandas as pd
-import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-import scipy.stats as st
-from matplotlib.ticker import ScalarFormatter
-from matplotlib.ticker import FuncFormatter
-from scipy.stats import chi2_contingency
-from scipy.stats import ttest_ind
-from statsmodels.stats.proportion import proportions_ztest
-
-def Main():
-    # Import the demo data
-    df_final_demo = vd.import_dataframe()
+import cache_vanguard as cv
+import ingest_vanguard as ingest
+import sessions_vanguard as sv
+import store_vanguard as vs
+import summary_vanguard as sm
+
+def Main(config_path=ingest.CONFIG_PATH):
+    # Read the list of datasets from the configuration
+    config = ingest.load_config(config_path)
+    source_files = ingest.source_paths(config)
+
+    # Hash the source files once; the cache and the dashboard stores are keyed on it
+    key = cv.hash_source_files(source_files)
+
+    # Reuse the columnar cache if the source files have not changed
+    variation_df = cv.read_variation_cache(source_files, key=key)
+    if variation_df is not None:
+        print("The experiment table has been loaded from the columnar cache.")
+        write_dashboard_stores(variation_df, source_files, key)
+        return variation_df
+
+    # Load every dataset concurrently
+    datasets = ingest.ingest(config=config)
+
     # Analyze client demographics
-    df_final_demo = vd.analyze_client_demographics(df_final_demo)
+    df_final_demo = vd.analyze_client_demographics(datasets["demo"])
     # Clean the demo DataFrame
     df_final_demo = vd.clean_dataframe(df_final_demo)
     
-    # Import and check the first part of the DataFrame
-    df_pt1 = vd.import_and_check_dataframe_part1()
-    # Import and check the second part of the DataFrame
-    df_pt2 = vd.import_and_check_dataframe_part2()
+    # Check every shard of the footprint DataFrame
+    for df_part in datasets["web_data"]:
+        vd.check_dataframe(df_part)
     
-    # Merge the two parts of the DataFrame
-    df = vd.merge_dataframes(df_pt1, df_pt2)
+    # Merge all the shards of the footprint DataFrame
+    # (sorted once by visit and time, the order the visit-level analyses need)
+    df = vd.merge_dataframes(*datasets["web_data"], sort_by="visit")
     
-    # Import and analyze experiment clients
-    df_final_experiment = vd.import_and_analyze_experiment_clients()
+    # Analyze experiment clients
+    df_final_experiment = vd.analyze_experiment_clients(datasets["experiment_clients"])
     
     # Merge and clean all DataFrames
     variation_df = vd.merge_and_clean_dataframes(df_final_demo, df, df_final_experiment)
     
     # Save the final DataFrame to a CSV file
     variation_df.to_csv('variation_df.csv', index=False)
-    print("The file 'variation_df.csv' has been saved on your computer.")
\ No newline at end of file
+    print("The file 'variation_df.csv' has been saved on your computer.")
+    
+    # Save the final DataFrame to the columnar cache
+    cache_path = cv.write_variation_cache(variation_df, source_files, key=key)
+    print(f"The columnar cache '{cache_path}' has been saved on your computer.")
+    
+    # Save the pre-aggregated summaries and the indexed visits the dashboard reads
+    write_dashboard_stores(variation_df, source_files, key)
+    
+    return variation_df
+
+def write_dashboard_stores(variation_df, source_files, key=None):
+    # Pre-aggregate the experiment table unless its stores already exist
+    key = key or cv.hash_source_files(source_files)
+    if os.path.exists(sm.summary_path_for(key)) and os.path.exists(vs.store_path_for(key)):
+        return
+    sessions = sv.sessionize(variation_df)
+    no_visit = an.no_visit_rows(variation_df)
+
+    summary_path = sm.write_summary(sm.summarize(sessions, no_visit), source_files, key=key)
+    print(f"The summary store '{summary_path}' has been saved on your computer.")
+
+    store_path = vs.write_store(vs.visit_table(sessions, variation_df, no_visit), source_files, key=key)
+    print(f"The visit store '{store_path}' has been saved on your computer.")
@@ -0,0 +1,518 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import sessions_vanguard as sv
+from lazy_vanguard import lazy_import
+
+# Statistics packages are imported on first use
+stats = lazy_import('scipy.stats')
+smprop = lazy_import('statsmodels.stats.proportion')
+
+
+# Significance level of the hypothesis tests
+ALPHA = 0.05
+
+
+@dataclass
+class TimeSpentResult:
+    """
+    Average time spent on each process step, over all visits.
+    """
+    time_spent_summary: pd.DataFrame
+
+@dataclass
+class CompletionResult:
+    """
+    Completion rate of each group and the z-test comparing Control and Test.
+    """
+    completion_data: pd.DataFrame
+    z_stat: float
+    p_value: float
+    alpha: float = ALPHA
+
+    @property
+    def is_significant(self):
+        return self.p_value < self.alpha
+
+@dataclass
+class DurationResult:
+    """
+    Mean session duration of each group and the t-test of Test sessions being longer than Control sessions.
+    """
+    control_mean: float
+    test_mean: float
+    t_stat: float
+    p_value: float
+    alpha: float = ALPHA
+
+    @property
+    def is_significant(self):
+        return self.p_value < self.alpha
+
+@dataclass
+class StepDurationResult:
+    """
+    Time spent on each process step per group and the Welch t-test of each step.
+    """
+    step_summary: pd.DataFrame
+    ttest_results: pd.DataFrame
+
+@dataclass
+class ErrorRateResult:
+    """
+    Backtrack (error) rate of each group and the chi-square test comparing them.
+    """
+    error_rates: pd.DataFrame
+    contingency_table: pd.DataFrame
+    chi2: float
+    p_value: float
+    alpha: float = ALPHA
+
+    @property
+    def is_significant(self):
+        return self.p_value < self.alpha
+
+@dataclass
+class CostEffectivenessResult:
+    """
+    Completion rate per Test client against the cost-effectiveness threshold, and the observed increase.
+    """
+    completion_rate_per_client: pd.Series
+    mean_completion_rate: float
+    t_stat: float
+    p_value: float
+    observed_increase: float
+    threshold: float
+    alpha: float = ALPHA
+
+    @property
+    def meets_threshold(self):
+        return self.mean_completion_rate >= self.threshold and self.p_value < self.alpha
+
+@dataclass
+class CompletionLiftResult:
+    """
+    Visit- and client-level completion rates of each group, the lift of Test over Control with its
+    cluster-robust standard error, and the one-sided test of the lift exceeding the threshold.
+    """
+    lift: pd.DataFrame
+    threshold: float
+    alpha: float = ALPHA
+
+    @property
+    def meets_threshold(self):
+        return self.lift.loc['visit', 'p_value'] < self.alpha
+
+@dataclass
+class ExperimentReport:
+    """
+    Results of every hypothesis of the experiment.
+    """
+    time_spent: TimeSpentResult
+    completion: CompletionResult
+    cost_effectiveness: CostEffectivenessResult
+    completion_lift: CompletionLiftResult
+    durations: DurationResult
+    durations_by_step: StepDurationResult
+    error_rates: ErrorRateResult
+
+
+def completion_table(sessions):
+    """
+    This function counts the sessions and the sessions that reached the "confirm" step for each group,
+    and calculates the completion rate for each group.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+
+    Returns:
+    pd.DataFrame: A DataFrame containing the total sessions, confirm sessions, and completion rate for each group.
+    """
+    completion_data = sessions.groupby('Variation', observed=True).agg(
+        total_sessions=('visit_id', 'size'),
+        confirm_sessions=('reached_confirm', 'sum'),
+    ).reset_index()
+    completion_data['completion_rate'] = (completion_data['confirm_sessions'] / completion_data['total_sessions']) * 100
+
+    return completion_data
+
+def time_spent(sessions):
+    """
+    This function calculates the average time spent on each step in the process.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+
+    Returns:
+    TimeSpentResult: The average time spent on each step.
+    """
+    return TimeSpentResult(sv.summarize_step_dwell(sessions)[['process_step', 'time_spent']])
+
+def completion_test(completion_data, alpha=ALPHA):
+    """
+    This function performs a z-test to compare the completion rates between the control and test groups.
+
+    Parameters:
+    completion_data (pd.DataFrame): The total and confirm sessions of each group, from completion_table.
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    CompletionResult: The completion data and the z-test results.
+    """
+    by_group = completion_data.set_index('Variation')
+
+    # Perform z-test for proportions
+    count = [by_group.loc['Control', 'confirm_sessions'], by_group.loc['Test', 'confirm_sessions']]
+    nobs = [by_group.loc['Control', 'total_sessions'], by_group.loc['Test', 'total_sessions']]
+    z_stat, p_value = smprop.proportions_ztest(count, nobs)
+
+    return CompletionResult(completion_data, z_stat, p_value, alpha)
+
+def completion_rates(sessions, alpha=ALPHA):
+    """
+    This function calculates the completion rates for each group and performs a z-test to compare the
+    completion rates between the control and test groups.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    CompletionResult: The completion data and the z-test results.
+    """
+    return completion_test(completion_table(sessions), alpha)
+
+def session_durations(sessions, alpha=ALPHA):
+    """
+    This function performs a t-test of the Test group's session durations being longer than the Control group's.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    DurationResult: The mean durations and the t-test results.
+    """
+    control_group = sessions.loc[sessions['Variation'] == 'Control', 'duration']
+    test_group = sessions.loc[sessions['Variation'] == 'Test', 'duration']
+
+    t_stat, p_value = stats.ttest_ind(test_group, control_group, alternative='greater')
+
+    return DurationResult(control_group.mean(), test_group.mean(), t_stat, p_value, alpha)
+
+def step_duration_tests(step_summary):
+    """
+    This function performs Welch's t-test on each step from the count, mean and standard deviation
+    of the time spent on the step by each group.
+
+    Parameters:
+    step_summary (pd.DataFrame): The Variation, process_step, count, time_spent and std of each group and step.
+
+    Returns:
+    StepDurationResult: The per-group step statistics and the t-test results for each process step.
+    """
+    by_group = step_summary.set_index(['Variation', 'process_step'])
+
+    results = []
+    for step in sv.STEP_ORDER:
+        control = by_group.loc[('Control', step)] if ('Control', step) in by_group.index else None
+        test = by_group.loc[('Test', step)] if ('Test', step) in by_group.index else None
+
+        t_stat, p_value = None, None
+        if control is not None and test is not None:
+            t_stat, p_value = stats.ttest_ind_from_stats(control['time_spent'], control['std'], control['count'],
+                                                         test['time_spent'], test['std'], test['count'],
+                                                         equal_var=False)
+        results.append({
+            'process_step': step,
+            'control_mean': control['time_spent'] if control is not None else None,
+            'test_mean': test['time_spent'] if test is not None else None,
+            't_stat': t_stat,
+            'p_value': p_value
+        })
+
+    return StepDurationResult(step_summary, pd.DataFrame(results))
+
+def session_durations_by_step(sessions):
+    """
+    This function calculates the time spent on each step for both control and test groups and performs
+    Welch's t-test on each step, from the per-step counts, sums and sums of squares of the visits.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+
+    Returns:
+    StepDurationResult: The per-group step statistics and the t-test results for each process step.
+    """
+    return step_duration_tests(sv.summarize_step_dwell(sessions, by='Variation'))
+
+def error_rate_test(counts, alpha=ALPHA):
+    """
+    This function calculates the backtrack (error) rate of each group from its event and backtrack counts
+    and performs a chi-square test to compare the error rates.
+
+    Parameters:
+    counts (pd.DataFrame): The n_events and backtracks of each group, indexed by Variation.
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    ErrorRateResult: The error rates, the contingency table and the chi-square test results.
+    """
+    rates = (counts['backtracks'] / counts['n_events']).reset_index(name='Error Rate')
+
+    # Events without and with backward navigation in each group
+    contingency_table = pd.DataFrame({False: counts['n_events'] - counts['backtracks'], True: counts['backtracks']})
+    chi2, p_value, dof, ex = stats.chi2_contingency(contingency_table)
+
+    return ErrorRateResult(rates, contingency_table, chi2, p_value, alpha)
+
+def no_visit_rows(variation_df):
+    """
+    This function counts the rows of each client that belong to no visit: the one row of each client
+    without a web footprint, and any event without a visit_id. sessions_vanguard.sessionize leaves them
+    out, while analyze_error_rates and analyze_cost_effectiveness count them as events that are neither
+    backtracks nor confirms; error_rates and cost_effectiveness add them back to match.
+
+    Parameters:
+    variation_df (pd.DataFrame): The merged event DataFrame.
+
+    Returns:
+    pd.Series: The number of rows without a visit, indexed by Variation and client_id.
+    """
+    rows = variation_df.loc[variation_df['visit_id'].isna(), ['Variation', 'client_id']]
+    return rows.groupby(['Variation', 'client_id'], observed=True).size()
+
+def no_visit_totals(no_visit):
+    """
+    This function sums the rows without a visit of each group.
+
+    Parameters:
+    no_visit (pd.Series): The rows without a visit of each client, from no_visit_rows.
+
+    Returns:
+    pd.Series: The number of rows without a visit of each group, indexed by the Variation label.
+    """
+    totals = no_visit.groupby(level='Variation', observed=True).sum()
+    totals.index = totals.index.astype(str)
+    return totals
+
+def error_rates(sessions, alpha=ALPHA, no_visit=None):
+    """
+    This function calculates the backtrack (error) rate of each group and performs a chi-square test
+    to compare the error rates.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+    alpha (float): The significance level (default is 0.05).
+    no_visit (pd.Series): The rows without a visit of each client, from no_visit_rows, counted as events
+    without backward navigation (default is to count the events of the visits only).
+
+    Returns:
+    ErrorRateResult: The error rates, the contingency table and the chi-square test results.
+    """
+    counts = sessions.groupby('Variation', observed=True)[['n_events', 'backtracks']].sum()
+    if no_visit is not None:
+        counts.index = counts.index.astype(str)
+        counts['n_events'] += no_visit_totals(no_visit).reindex(counts.index, fill_value=0)
+    return error_rate_test(counts, alpha)
+
+def client_table(sessions, no_visit=None):
+    """
+    This function sums the visits of each client: the number of visits and confirm visits,
+    and the number of events and "confirm" events.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+    no_visit (pd.Series): The rows without a visit of each client, from no_visit_rows, counted as events
+    (default is to list the clients with a visit only).
+
+    Returns:
+    pd.DataFrame: The visits, confirms, n_events and events_confirm of each client, indexed by Variation and client_id.
+    """
+    clients = sessions.groupby(['Variation', 'client_id'], observed=True).agg(
+        visits=('visit_id', 'size'),
+        confirms=('reached_confirm', 'sum'),
+        n_events=('n_events', 'sum'),
+        events_confirm=('events_confirm', 'sum'),
+    )
+    if no_visit is not None:
+        clients = add_no_visit_rows(clients, no_visit)
+
+    return clients
+
+def add_no_visit_rows(clients, no_visit):
+    """
+    This function adds the rows without a visit to the events of the per-client sums,
+    listing the clients without a web footprint with no visit.
+
+    Parameters:
+    clients (pd.DataFrame): The per-client sums, from client_table.
+    no_visit (pd.Series): The rows without a visit of each client, from no_visit_rows.
+
+    Returns:
+    pd.DataFrame: The per-client sums with the rows without a visit counted in n_events.
+    """
+    index = clients.index.union(no_visit.index)
+    clients = clients.reindex(index, fill_value=0)
+    clients['n_events'] += no_visit.reindex(index, fill_value=0).to_numpy()
+    return clients
+
+def cost_effectiveness_test(clients, completion, threshold=5.0, alpha=ALPHA):
+    """
+    This function performs the one-sample t-test of cost_effectiveness from the per-client sums.
+
+    Parameters:
+    clients (pd.DataFrame): The per-client sums, from client_table.
+    completion (CompletionResult): The completion rates of each group.
+    threshold (float): The threshold for the minimum increase in completion rate (default is 5%).
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    CostEffectivenessResult: The per-client completion rates and the one-sample t-test results.
+    """
+    # Share of confirm events of each Test client, in percent
+    client_counts = clients.xs('Test', level='Variation')
+    completion_rate = client_counts['events_confirm'] / client_counts['n_events'] * 100
+
+    # Perform a one-sample t-test against the threshold
+    t_stat, p_value = stats.ttest_1samp(completion_rate, threshold)
+
+    # Observed increase in completion rate
+    rates = completion.completion_data.set_index('Variation')['completion_rate']
+    observed_increase = rates['Test'] - rates['Control']
+
+    return CostEffectivenessResult(completion_rate, completion_rate.mean(), t_stat, p_value,
+                                   observed_increase, threshold, alpha)
+
+def cost_effectiveness(sessions, completion, threshold=5.0, alpha=ALPHA, no_visit=None):
+    """
+    This function reproduces analyze_cost_effectiveness: the share of each Test client's events that are
+    "confirm" events is tested against the threshold, and the observed increase in completion rate is reported.
+    That share is not a completion rate; see completion_lift for the test of the lift against the threshold.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+    completion (CompletionResult): The completion rates of each group.
+    threshold (float): The threshold for the minimum increase in completion rate (default is 5%).
+    alpha (float): The significance level (default is 0.05).
+    no_visit (pd.Series): The rows without a visit of each client, from no_visit_rows, so that the clients
+    without a web footprint are tested with a share of 0% as in analyze_cost_effectiveness
+    (default is to test the clients with a visit only).
+
+    Returns:
+    CostEffectivenessResult: The per-client completion rates and the one-sample t-test results.
+    """
+    return cost_effectiveness_test(client_table(sessions, no_visit), completion, threshold, alpha)
+
+def completion_lift_test(clients, threshold=5.0, alpha=ALPHA):
+    """
+    This function performs the lift-vs-threshold tests of completion_lift from the per-client sums.
+
+    Parameters:
+    clients (pd.DataFrame): The per-client sums, from client_table.
+    threshold (float): The minimum lift in completion rate, in percentage points (default is 5).
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    CompletionLiftResult: The rates, lift, standard error, confidence interval and one-sided test
+    (H0: lift <= threshold) of each level.
+    """
+    # Visits and confirm visits of each client with a visit
+    clients = clients[clients['visits'] > 0]
+    visits, confirms = clients['visits'].astype(float), clients['confirms'].astype(float)
+
+    # Sums per group of everything the rates and their variances need
+    sums = pd.DataFrame({
+        'clients': 1.0,
+        'converted': (confirms > 0).astype(float),
+        'visits': visits,
+        'confirms': confirms,
+        'visits_sq': visits ** 2,
+        'confirms_sq': confirms ** 2,
+        'cross': visits * confirms,
+    }).groupby(level='Variation', observed=True).sum()
+    sums.index = sums.index.astype(str)
+
+    # Visit level: ratio of sums with the cluster-robust variance sum((y - r n)^2) / N^2, corrected for k clusters
+    visit_rate = sums['confirms'] / sums['visits']
+    residual_sq = sums['confirms_sq'] - 2 * visit_rate * sums['cross'] + visit_rate ** 2 * sums['visits_sq']
+    k = sums['clients']
+    visit_var = k / (k - 1) * residual_sq.clip(lower=0) / sums['visits'] ** 2
+
+    # Client level: share of independent clients who completed at least once
+    client_rate = sums['converted'] / k
+    client_var = client_rate * (1 - client_rate) / k
+
+    # Lift in percentage points, tested against the threshold
+    z_crit = stats.norm.ppf(1 - alpha / 2)
+    rows = {}
+    for level, rate, var in [('visit', visit_rate, visit_var), ('client', client_rate, client_var)]:
+        lift = (rate['Test'] - rate['Control']) * 100
+        std_error = np.sqrt(var['Test'] + var['Control']) * 100
+        z_stat = (lift - threshold) / std_error
+        rows[level] = {
+            'control_rate': rate['Control'] * 100,
+            'test_rate': rate['Test'] * 100,
+            'lift': lift,
+            'std_error': std_error,
+            'ci_low': lift - z_crit * std_error,
+            'ci_high': lift + z_crit * std_error,
+            'z_stat': z_stat,
+            'p_value': stats.norm.sf(z_stat),
+        }
+
+    return CompletionLiftResult(pd.DataFrame.from_dict(rows, orient='index').rename_axis('level'), threshold, alpha)
+
+def completion_lift(sessions, threshold=5.0, alpha=ALPHA):
+    """
+    This function calculates the completion rate of each group at the visit level (share of visits that
+    reached the "confirm" step) and at the client level (share of clients with at least one such visit),
+    and tests whether the lift of Test over Control exceeds the threshold.
+
+    The visits are summed per client, then the per-client sums, squares and cross products are summed per
+    group in one grouped pass. The variance of the visit-level rate is the delta-method (cluster-robust)
+    variance of a ratio of sums over clients, as the visits of a client are not independent.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+    threshold (float): The minimum lift in completion rate, in percentage points (default is 5).
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    CompletionLiftResult: The rates, lift, standard error, confidence interval and one-sided test
+    (H0: lift <= threshold) of each level.
+    """
+    return completion_lift_test(client_table(sessions), threshold, alpha)
+
+def analyze_experiment(variation_df=None, sessions=None, alpha=ALPHA, threshold=5.0, no_visit=None):
+    """
+    This function runs every hypothesis of the experiment without printing or plotting anything.
+
+    Parameters:
+    variation_df (pd.DataFrame): The merged event DataFrame (not needed when sessions is given).
+    sessions (pd.DataFrame): The per-visit DataFrame (default is to build it from variation_df).
+    alpha (float): The significance level (default is 0.05).
+    threshold (float): The cost-effectiveness threshold (default is 5%).
+    no_visit (pd.Series): The rows without a visit of each client (default is to count them in variation_df,
+    when given).
+
+    Returns:
+    ExperimentReport: The results of every hypothesis.
+    """
+    if sessions is None:
+        sessions = sv.sessionize(variation_df)
+    if no_visit is None and variation_df is not None:
+        no_visit = no_visit_rows(variation_df)
+
+    completion = completion_rates(sessions, alpha)
+    return ExperimentReport(
+        time_spent=time_spent(sessions),
+        completion=completion,
+        cost_effectiveness=cost_effectiveness(sessions, completion, threshold, alpha, no_visit),
+        completion_lift=completion_lift(sessions, threshold, alpha),
+        durations=session_durations(sessions, alpha),
+        durations_by_step=session_durations_by_step(sessions),
+        error_rates=error_rates(sessions, alpha, no_visit),
+    )
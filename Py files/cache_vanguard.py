@@ -0,0 +1,141 @@
+import glob
+import hashlib
+import os
+
+import pyarrow.feather as feather
+
+
+# Default directory of the columnar cache
+CACHE_DIR = "cache"
+
+# Prefix of the cached experiment tables
+CACHE_PREFIX = "variation_"
+
+# Version of the cached layout, bumped whenever the merged table or its stores change shape or dtypes
+CACHE_VERSION = "5"
+
+
+def hash_source_files(file_paths, block_size=1 << 20):
+    """
+    This function computes a content hash over the given source files, in order.
+    The hash only changes when the bytes of a source file change, not when it is touched or moved.
+
+    Parameters:
+    file_paths (list of str): The paths of the source files.
+    block_size (int): The number of bytes hashed at a time (default is 1 MiB).
+
+    Returns:
+    str: The hexadecimal content hash.
+    """
+    digest = hashlib.sha256(CACHE_VERSION.encode())
+
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        # Separate the files so moving bytes from one file to the next changes the hash
+        digest.update(b"\0")
+
+    return digest.hexdigest()[:16]
+
+def cache_path_for(key, cache_dir=CACHE_DIR):
+    """
+    This function returns the path of the cached experiment table for a content hash.
+
+    Parameters:
+    key (str): The content hash of the source files.
+    cache_dir (str): The directory of the columnar cache.
+
+    Returns:
+    str: The path of the Feather file.
+    """
+    return os.path.join(cache_dir, f"{CACHE_PREFIX}{key}.feather")
+
+def write_variation_cache(variation_df, file_paths, cache_dir=CACHE_DIR, key=None):
+    """
+    This function writes the merged experiment table to the columnar cache as an uncompressed
+    Feather (Arrow IPC) file, so that readers can memory-map it instead of parsing it.
+
+    Parameters:
+    variation_df (pd.DataFrame): The merged and cleaned experiment DataFrame.
+    file_paths (list of str): The paths of the source files the DataFrame was built from.
+    cache_dir (str): The directory of the columnar cache.
+    key (str): The content hash of the source files, from hash_source_files (default is to compute it).
+
+    Returns:
+    str: The path of the written Feather file.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = cache_path_for(key or hash_source_files(file_paths), cache_dir)
+
+    # Write to a temporary file first so readers never see a half-written cache
+    tmp_path = cache_path + ".tmp"
+    feather.write_feather(variation_df.reset_index(drop=True), tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+
+    return cache_path
+
+def read_cache_file(cache_path):
+    """
+    This function memory-maps a cached Feather file and converts it into a pandas DataFrame.
+    Dictionary-encoded columns come back as categoricals and timestamps as datetime64.
+
+    Parameters:
+    cache_path (str): The path of the Feather file.
+
+    Returns:
+    pd.DataFrame: The cached DataFrame.
+    """
+    table = feather.read_table(cache_path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+def read_variation_cache(file_paths, cache_dir=CACHE_DIR, key=None):
+    """
+    This function reads the cached experiment table built from the given source files.
+
+    Parameters:
+    file_paths (list of str): The paths of the source files.
+    cache_dir (str): The directory of the columnar cache.
+    key (str): The content hash of the source files, from hash_source_files (default is to compute it).
+
+    Returns:
+    pd.DataFrame or None: The cached DataFrame, or None if the sources have no cache entry.
+    """
+    cache_path = cache_path_for(key or hash_source_files(file_paths), cache_dir)
+    if not os.path.exists(cache_path):
+        return None
+
+    return read_cache_file(cache_path)
+
+def latest_variation_cache_path(cache_dir=CACHE_DIR):
+    """
+    This function finds the most recently written experiment table of the cache.
+
+    Parameters:
+    cache_dir (str): The directory of the columnar cache.
+
+    Returns:
+    str or None: The path of the cache file, or None if the cache is empty.
+    """
+    cache_paths = glob.glob(os.path.join(cache_dir, f"{CACHE_PREFIX}*.feather"))
+    if not cache_paths:
+        return None
+
+    return max(cache_paths, key=os.path.getmtime)
+
+def read_latest_variation_cache(cache_dir=CACHE_DIR):
+    """
+    This function reads the most recently written experiment table of the cache, without hashing
+    the source files. It is meant for readers such as the dashboard that do not own the sources.
+
+    Parameters:
+    cache_dir (str): The directory of the columnar cache.
+
+    Returns:
+    pd.DataFrame or None: The cached DataFrame, or None if the cache is empty.
+    """
+    cache_path = latest_variation_cache_path(cache_dir)
+    if cache_path is None:
+        return None
+
+    return read_cache_file(cache_path)
@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import sessions_vanguard as sv
+
+
+# Groups of the experiment, in the order of their codes in the compact tables
+VARIATION_ORDER = ['Control', 'Test']
+
+
+@dataclass
+class CompactExperiment:
+    """
+    Star-schema form of the merged experiment table. The events hold integer codes only: the client index
+    (a row of the clients table), the visit index (a position in visit_ids), the step code, the timestamp
+    in nanoseconds and the Variation code. The clients table holds the roster group and the demographics once
+    per client, looked up by client index when needed.
+    """
+    events: pd.DataFrame
+    clients: pd.DataFrame
+    visit_ids: np.ndarray
+
+    @property
+    def nbytes(self):
+        return int(self.events.memory_usage(deep=True).sum() + self.clients.memory_usage(deep=True).sum()
+                   + pd.Series(self.visit_ids).memory_usage(deep=True))
+
+def compact_experiment(df_final_demo, df_merged, df_final_experiment_clients):
+    """
+    This function builds the compact form of merge_and_clean_dataframes: the clients of the demographics
+    table that are in the experiment roster, and the web footprint events of those clients, sorted by visit
+    and time. The demographics are not copied onto the events.
+
+    Parameters:
+    df_final_demo (pd.DataFrame): The client profiles.
+    df_merged (pd.DataFrame): The web footprint events.
+    df_final_experiment_clients (pd.DataFrame): The experiment roster with client_id and Variation columns.
+
+    Returns:
+    CompactExperiment: The events and clients tables.
+    """
+    # One row per client in the experiment; the row position is the client index
+    clients = pd.merge(df_final_demo, df_final_experiment_clients, on="client_id", how="inner")
+    clients = clients.dropna(subset=["Variation"]).drop_duplicates("client_id").reset_index(drop=True)
+    clients["Variation"] = pd.Categorical(clients["Variation"], categories=VARIATION_ORDER).codes.astype(np.int8)
+
+    # Client index of every event, dropping the events of clients outside the experiment
+    client_index = pd.Index(clients["client_id"]).get_indexer(df_merged["client_id"])
+    in_experiment = client_index >= 0
+    events = df_merged[in_experiment]
+    client_index = client_index[in_experiment].astype(np.int32)
+
+    # Integer codes of the visits, timestamps and steps
+    visit_index, visit_ids = pd.factorize(events["visit_id"])
+    times = pd.to_datetime(events["date_time"]).to_numpy(dtype="datetime64[ns]").view(np.int64)
+    compact_events = pd.DataFrame({
+        "client_index": client_index,
+        "visit_index": visit_index.astype(np.int32),
+        "step": sv.step_codes(events["process_step"]),
+        "date_time": times,
+        "Variation": clients["Variation"].to_numpy()[client_index],
+    })
+
+    # Sort once by visit and time, so sessionizing needs no further sort
+    if not sv.is_visit_ordered(df_merged):
+        order = np.lexsort((compact_events["date_time"].to_numpy(), compact_events["visit_index"].to_numpy()))
+        compact_events = compact_events.iloc[order].reset_index(drop=True)
+
+    return CompactExperiment(compact_events, clients, np.asarray(visit_ids))
+
+def lookup(compact, columns, client_index=None):
+    """
+    This function looks up client attributes by client index.
+
+    Parameters:
+    compact (CompactExperiment): The compact experiment.
+    columns (list of str): The columns of the clients table, e.g. ['client_id', 'clnt_age'].
+    client_index (np.ndarray): The client indexes (default is the client of every event).
+
+    Returns:
+    pd.DataFrame: The attributes, one row per client index.
+    """
+    if client_index is None:
+        client_index = compact.events["client_index"].to_numpy()
+
+    return compact.clients[list(columns)].iloc[client_index].reset_index(drop=True)
+
+def event_frame(compact):
+    """
+    This function views the compact events as the columns sessions_vanguard.sessionize reads, keeping
+    the integer codes: the visit index as visit_id, the client index as client_id and the Variation code.
+    """
+    events = compact.events
+    frame = pd.DataFrame({
+        "visit_id": events["visit_index"].to_numpy(),
+        "client_id": events["client_index"].to_numpy(),
+        "Variation": events["Variation"].to_numpy(),
+        "date_time": events["date_time"].to_numpy().view("datetime64[ns]"),
+        "process_step": pd.Categorical.from_codes(events["step"].to_numpy(), categories=sv.STEP_ORDER, ordered=True),
+    })
+    frame.attrs["sort_order"] = sv.VISIT_ORDER
+
+    return frame
+
+def sessionize(compact):
+    """
+    This function builds the per-visit table of sessions_vanguard.sessionize directly from the compact
+    events; only the labels of the visits are decoded, once per visit.
+
+    Parameters:
+    compact (CompactExperiment): The compact experiment.
+
+    Returns:
+    pd.DataFrame: The per-visit DataFrame, with the same columns as sessions_vanguard.sessionize.
+    """
+    sessions = sv.sessionize(event_frame(compact))
+
+    # Decode the visit, client and Variation of each visit
+    client_index = sessions["client_id"].to_numpy()
+    sessions["visit_id"] = compact.visit_ids[sessions["visit_id"].to_numpy()]
+    sessions["client_id"] = compact.clients["client_id"].astype(str).to_numpy()[client_index]
+    sessions["Variation"] = np.asarray(VARIATION_ORDER)[sessions["Variation"].to_numpy()]
+
+    return sessions
+
+def to_variation_df(compact, columns=None):
+    """
+    This function expands the compact experiment back to the wide event table of
+    merge_and_clean_dataframes (without visitor_id, which the compact events do not keep),
+    for the analyses that still need it.
+
+    Parameters:
+    compact (CompactExperiment): The compact experiment.
+    columns (list of str): The client attributes to attach to every event (default is all of them).
+
+    Returns:
+    pd.DataFrame: One row per event with the client attributes, visit_id, process_step, date_time and Variation.
+    """
+    if columns is None:
+        columns = [column for column in compact.clients.columns if column not in ("client_id", "Variation")]
+
+    events = compact.events
+    variation_df = lookup(compact, ["client_id"] + list(columns))
+    variation_df["visit_id"] = compact.visit_ids[events["visit_index"].to_numpy()]
+    variation_df["process_step"] = pd.Categorical.from_codes(events["step"].to_numpy(), categories=sv.STEP_ORDER,
+                                                             ordered=True)
+    variation_df["date_time"] = events["date_time"].to_numpy().view("datetime64[ns]")
+    variation_df["Variation"] = np.asarray(VARIATION_ORDER)[events["Variation"].to_numpy()]
+    variation_df["client_id"] = variation_df["client_id"].astype(str)
+    variation_df.attrs["sort_order"] = sv.VISIT_ORDER
+
+    return variation_df
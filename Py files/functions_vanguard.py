@@ -1,29 +1,63 @@
-
-import functions_vanguard as vd
+import analysis_vanguard as an
+import kernels_vanguard as vk
+from lazy_vanguard import lazy_import
+from sessions_vanguard import STEP_ORDER, VISIT_ORDER, visit_arrays, is_visit_ordered
 import pandas as pd
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-import scipy.stats as stats
-from matplotlib.ticker import ScalarFormatter
-from matplotlib.ticker import FuncFormatter
-from scipy.stats import chi2_contingency
-from scipy.stats import ttest_ind
-from statsmodels.stats.proportion import proportions_ztest
+from pandas.api.types import union_categoricals
+
+# Plotting and statistics packages are imported on first use
+sns = lazy_import('seaborn')
+plt = lazy_import('matplotlib.pyplot')
+stats = lazy_import('scipy.stats')
+smprop = lazy_import('statsmodels.stats.proportion')
+
+
+# Explicit schema of the web footprint files ('date_time' is parsed separately)
+WEB_DATA_DTYPES = {
+    'client_id': 'int32',
+    'visitor_id': 'category',
+    'visit_id': 'category',
+    'process_step': pd.CategoricalDtype(STEP_ORDER, ordered=True),
+}
+
+# Timestamp format used in the web footprint files
+WEB_DATA_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Categories of the experiment groups and of the derived client segments, in code order
+VARIATION_DTYPE = pd.CategoricalDtype(['Control', 'Test'])
+CLIENT_STATUS_DTYPE = pd.CategoricalDtype(['New', 'Long-standing'])
+AGE_GROUP_DTYPE = pd.CategoricalDtype(['Younger', 'Older'])
+
+# Schemas of the client profiles and experiment roster files (other columns are inferred)
+DEMO_DTYPES = {'gendr': 'category'}
+EXPERIMENT_CLIENTS_DTYPES = {'Variation': VARIATION_DTYPE}
+
+# Categorical columns of the client profiles, stored as categories by clean_dataframe
+DEMO_CATEGORIES = {'gendr': 'category', 'client_status': CLIENT_STATUS_DTYPE, 'age_group': AGE_GROUP_DTYPE}
+
+# Widest client_id range the join index maps through a dense table (int32 positions, 64 MB);
+# wider ranges are looked up with np.searchsorted
+DENSE_INDEX_MAX_SPAN = 1 << 24
 
+# Most client_id values the dense table may hold per experiment client, so that sparse ids
+# do not build a table far larger than the index itself
+DENSE_INDEX_MAX_FILL = 8
 
-def import_dataframe():
+
+def import_dataframe(file_path="data/df_final_demo.txt", dtype=None):
     """
     This function imports a CSV file into a pandas DataFrame.
 
+    Parameters:
+    file_path (str): The path of the CSV file (default is the client profiles file).
+    dtype (dict): The dtypes of some columns, e.g. DEMO_DTYPES (default is to infer them).
+
     Returns:
     pd.DataFrame: The imported DataFrame.
     """
-    # File path
-    file_path = "data/df_final_demo.txt"
-    
     # Import the data
-    df = pd.read_csv(file_path)
+    df = pd.read_csv(file_path, dtype=dtype)
     
     return df
 
@@ -110,14 +144,16 @@ def analyze_client_demographics(df):
     # Display the first few rows to inspect the calculation
     print(df[['client_id', 'clnt_tenure_yr', 'clnt_tenure_mnth', 'total_tenure_months']].head())
 
-    # Categorize clients as new or long-standing
-    df['client_status'] = np.where(df['total_tenure_months'] <= 24, 'New', 'Long-standing')
+    # Categorize clients as new or long-standing, as codes of the categorical
+    df['client_status'] = pd.Categorical.from_codes(np.where(df['total_tenure_months'] <= 24, 0, 1),
+                                                    dtype=CLIENT_STATUS_DTYPE)
 
     # Display the first few rows of the dataframe to inspect the new columns
     print(df[['client_id', 'client_status', 'total_tenure_months']].head())
 
-    # Categorize clients as younger or older
-    df['age_group'] = np.where(df['clnt_age'] <= df['clnt_age'].median(), 'Younger', 'Older')
+    # Categorize clients as younger or older, as codes of the categorical
+    df['age_group'] = pd.Categorical.from_codes(np.where(df['clnt_age'] <= df['clnt_age'].median(), 0, 1),
+                                                dtype=AGE_GROUP_DTYPE)
 
     # Display the first few rows to inspect the new columns
     print(df[['client_id', 'clnt_age', 'age_group']].head())
@@ -139,7 +175,7 @@ def identify_primary_clients(df):
     pd.DataFrame: The DataFrame containing the count of primary clients by tenure and age group.
     """
     # Primary clients' demographics
-    primary_clients = df.groupby(['client_status', 'age_group']).size().reset_index(name='count')
+    primary_clients = df.groupby(['client_status', 'age_group'], observed=True).size().reset_index(name='count')
     print("Primary Clients by Tenure and Age Group:")
     print(primary_clients)
     
@@ -179,25 +215,78 @@ def clean_dataframe(df):
     print("Data types before adjustment:")
     print(df.dtypes)
     
+    # Store the categorical columns as categories
+    for column, dtype in DEMO_CATEGORIES.items():
+        if column in df.columns:
+            df[column] = df[column].astype(dtype)
+    
     # Display the data types of each column after adjustment
     print("Data types after adjustment:")
     print(df.dtypes)
     
     return df
 
-def import_and_check_dataframe_part1():
+def import_web_data(file_path, chunksize=500_000):
     """
-    This function imports a CSV file into a pandas DataFrame and checks for null values.
+    This function streams a web footprint file into a pandas DataFrame in fixed-size chunks.
+    Each chunk is read with an explicit schema and compacted before the next one is read,
+    so the raw text columns never exist for the whole file at once.
+
+    Parameters:
+    file_path (str): The path of the web footprint file.
+    chunksize (int): The number of rows read per chunk (default is 500,000).
 
     Returns:
-    pd.DataFrame: The imported DataFrame if no null values are found.
+    pd.DataFrame: The typed DataFrame, with 'date_time' parsed to datetime64.
+    """
+    # Read the file chunk by chunk with the explicit schema
+    reader = pd.read_csv(file_path, dtype=WEB_DATA_DTYPES, chunksize=chunksize)
+
+    chunks = []
+    for chunk in reader:
+        # Parse the timestamps once, at read time
+        chunk['date_time'] = pd.to_datetime(chunk['date_time'], format=WEB_DATA_DATE_FORMAT)
+        chunks.append(chunk)
+
+    # Combine the chunks without losing the categorical columns
+    return concat_dataframes(chunks)
+
+def concat_dataframes(frames):
+    """
+    This function concatenates DataFrames row-wise while keeping categorical columns categorical.
+    A plain pd.concat falls back to object dtype when the categories of the frames differ.
+
+    Parameters:
+    frames (list of pd.DataFrame): The DataFrames to be concatenated, all with the same columns.
+
+    Returns:
+    pd.DataFrame: The concatenated DataFrame with a fresh RangeIndex.
+    """
+    # Nothing to combine
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    columns = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype) and not parts[0].cat.ordered:
+            # Union the categories of every frame
+            columns[column] = pd.Series(union_categoricals(parts))
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+
+    return pd.DataFrame(columns)
+
+def check_dataframe(df):
+    """
+    This function checks a DataFrame for null values.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to be checked, e.g. a web footprint shard.
+
+    Returns:
+    pd.DataFrame: The DataFrame, unchanged.
     """
-    # File path
-    file_path = "data/df_final_web_data_pt_1.txt"
-    
-    # Import the data
-    df = pd.read_csv(file_path)
-    
     # Check for null values
     null_counts = df.isna().sum()
     print("Null values in each column:")
@@ -206,62 +295,89 @@ def import_and_check_dataframe_part1():
     # Return the DataFrame
     return df
 
-def import_and_check_dataframe_part2():
+def import_and_check_dataframe_part1(file_path="data/df_final_web_data_pt_1.txt"):
     """
     This function imports a CSV file into a pandas DataFrame and checks for null values.
 
+    Parameters:
+    file_path (str): The path of the first web footprint file.
+
     Returns:
     pd.DataFrame: The imported DataFrame if no null values are found.
     """
-    # File path
-    file_path = "data/df_final_web_data_pt_2.txt"
-    
-    # Import the data
-    df = pd.read_csv(file_path)
-    
-    # Check for null values
-    null_counts = df.isna().sum()
-    print("Null values in each column:")
-    print(null_counts)
-    
-    # Return the DataFrame
-    return df
+    # Import the data and check it for null values
+    return check_dataframe(import_web_data(file_path))
+
+def import_and_check_dataframe_part2(file_path="data/df_final_web_data_pt_2.txt"):
+    """
+    This function imports a CSV file into a pandas DataFrame and checks for null values.
 
-def merge_dataframes(df1, df2):
+    Parameters:
+    file_path (str): The path of the second web footprint file.
+
+    Returns:
+    pd.DataFrame: The imported DataFrame if no null values are found.
     """
-    This function merges two DataFrames and sorts them by 'client_id'.
+    # Import the data and check it for null values
+    return check_dataframe(import_web_data(file_path))
+
+def merge_dataframes(*dfs, sort_by="client_id"):
+    """
+    This function merges any number of DataFrames, such as the web footprint shards,
+    and sorts them by 'client_id'.
+
+    With sort_by="visit" the rows are instead sorted once by visit and time, and the order
+    is recorded in df.attrs['sort_order'] so that analyze_time_spent and analyze_error_rates
+    can skip their own sorts. With sort_by=None the rows are left in shard order.
 
     Parameters:
-    df1 (pd.DataFrame): The first DataFrame to be merged.
-    df2 (pd.DataFrame): The second DataFrame to be merged.
+    *dfs (pd.DataFrame): The DataFrames to be merged.
+    sort_by (str or None): "client_id" (default), "visit" or None.
 
     Returns:
     pd.DataFrame: The merged and sorted DataFrame.
     """
     # Merge the DataFrames
-    df = pd.concat([df1, df2], axis=0)
-    
-    # Sort the DataFrame by 'client_id'
-    df.sort_values(by="client_id", ascending=True, inplace=True)
+    df = concat_dataframes(list(dfs))
+    
+    if sort_by == "client_id":
+        # Sort the DataFrame by 'client_id'
+        df.sort_values(by="client_id", ascending=True, inplace=True)
+    elif sort_by == "visit":
+        # Sort the DataFrame once, in the order the visit-level analyses need
+        df.sort_values(by=VISIT_ORDER, inplace=True, ignore_index=True)
+        df.attrs['sort_order'] = VISIT_ORDER
+    elif sort_by is not None:
+        raise ValueError(f"sort_by must be 'client_id', 'visit' or None, not {sort_by!r}")
     
     return df
 
-def import_and_analyze_experiment_clients():
+def import_and_analyze_experiment_clients(file_path="data/df_final_experiment_clients.txt"):
     """
     This function imports a CSV file into a pandas DataFrame, determines the size of each group,
     and checks for null values in the DataFrame.
 
+    Parameters:
+    file_path (str): The path of the experiment roster file.
+
     Returns:
     pd.DataFrame: The imported DataFrame.
     """
-    # File path
-    file_path = "data/df_final_experiment_clients.txt"
-    
-    # Import the data
-    df = pd.read_csv(file_path)
-    
+    # Import the data, with the groups as categories, and analyze it
+    return analyze_experiment_clients(pd.read_csv(file_path, dtype=EXPERIMENT_CLIENTS_DTYPES))
+
+def analyze_experiment_clients(df):
+    """
+    This function determines the size of each group of the experiment roster and checks it for null values.
+
+    Parameters:
+    df (pd.DataFrame): The experiment roster.
+
+    Returns:
+    pd.DataFrame: The DataFrame, unchanged.
+    """
     # Determine the size of each group
-    variation = df.groupby("Variation").size()
+    variation = df.groupby("Variation", observed=True).size()
     print("Size of each group:")
     print(variation)
     
@@ -273,9 +389,83 @@ def import_and_analyze_experiment_clients():
     return df
 
 
+def client_index(df_final_demo, df_final_experiment_clients):
+    """
+    This function builds the join index of the experiment clients: the sorted client_ids that are both
+    in the client profiles and in the experiment roster with a group, with the row of each one in the
+    two tables. Events are matched to it through a dense table of positions by client_id when the ids
+    span at most DENSE_INDEX_MAX_SPAN values and DENSE_INDEX_MAX_FILL values per client, and with
+    np.searchsorted otherwise (see lookup_clients).
+
+    Parameters:
+    df_final_demo (pd.DataFrame): The client profiles.
+    df_final_experiment_clients (pd.DataFrame): The experiment roster with client_id and Variation columns.
+
+    Returns:
+    dict: The sorted 'client_ids', their 'demo_rows' and 'roster_rows' positions and the 'dense' table
+    (None for wide or sparse ranges), or None when a client_id repeats in either table (the rows then multiply as in a merge).
+    """
+    demo_ids = df_final_demo["client_id"].to_numpy(dtype=np.int64)
+    roster_ids = df_final_experiment_clients["client_id"].to_numpy(dtype=np.int64)
+    if pd.Index(demo_ids).has_duplicates or pd.Index(roster_ids).has_duplicates:
+        return None
+
+    # Roster first: only the clients with a group
+    roster_rows = np.flatnonzero(df_final_experiment_clients["Variation"].notna().to_numpy())
+    order = np.argsort(roster_ids[roster_rows])
+    client_ids, roster_rows = roster_ids[roster_rows][order], roster_rows[order]
+
+    # Then the clients with a profile
+    demo_order = np.argsort(demo_ids)
+    position = np.searchsorted(demo_ids[demo_order], client_ids).clip(max=max(len(demo_ids) - 1, 0))
+    in_demo = demo_ids[demo_order][position] == client_ids if len(demo_ids) else np.zeros(len(client_ids), bool)
+
+    client_ids = client_ids[in_demo]
+
+    # Position of every client_id of the range, -1 for the ids outside the experiment
+    dense = None
+    span = client_ids[-1] - client_ids[0] + 1 if len(client_ids) else 0
+    if len(client_ids) and span <= DENSE_INDEX_MAX_SPAN and span <= DENSE_INDEX_MAX_FILL * len(client_ids):
+        dense = np.full(span, -1, dtype=np.int32)
+        dense[client_ids - client_ids[0]] = np.arange(len(client_ids), dtype=np.int32)
+
+    return {
+        "client_ids": client_ids,
+        "demo_rows": demo_order[position[in_demo]],
+        "roster_rows": roster_rows[in_demo],
+        "dense": dense,
+    }
+
+def lookup_clients(index, client_ids):
+    """
+    This function finds client_ids in the join index.
+
+    Parameters:
+    index (dict): The join index, from client_index.
+    client_ids (array-like): The client_ids to look up.
+
+    Returns:
+    np.ndarray: The position of each client_id in the index, or -1 when it is not an experiment client.
+    """
+    client_ids = np.asarray(client_ids, dtype=np.int64)
+    if len(index["client_ids"]) == 0:
+        return np.full(len(client_ids), -1, dtype=np.int64)
+
+    if index["dense"] is not None:
+        offset = client_ids - index["client_ids"][0]
+        in_range = (offset >= 0) & (offset < len(index["dense"]))
+        return np.where(in_range, index["dense"][np.where(in_range, offset, 0)], -1).astype(np.int64)
+
+    position = np.searchsorted(index["client_ids"], client_ids).clip(max=len(index["client_ids"]) - 1)
+    return np.where(index["client_ids"][position] == client_ids, position, -1)
+
 def merge_and_clean_dataframes(df_final_demo, df_merged, df_final_experiment_clients):
     """
     This function merges multiple data frames and drops rows with null values in the 'Variation' column.
+    The events are matched to the experiment clients through the join index of client_index, so the
+    clients outside the roster are dropped before any demographic column is attached. The events keep
+    their order, so footprints in visit order give a table in visit order, and the experiment clients
+    without events follow with one empty row each.
 
     Parameters:
     df_final_demo (pd.DataFrame): The first DataFrame to be merged.
@@ -285,18 +475,45 @@ def merge_and_clean_dataframes(df_final_demo, df_merged, df_final_experiment_cli
     Returns:
     pd.DataFrame: The merged and cleaned DataFrame.
     """
-    # Merge the data frames
-    new_df = pd.merge(df_final_demo, df_merged, how="left", on="client_id")
-    
-    # Merge with the experiment clients data frame
-    variation_df = pd.merge(new_df, df_final_experiment_clients, on="client_id", how="inner")
-    
-    # Reset index and drop rows with null values in 'Variation' column
-    variation_df.reset_index(drop=True, inplace=True)
-    variation_df.dropna(subset=["Variation"], inplace=True)
-
-    # Adjust the data type of 'client_id' to string
-    variation_df["client_id"] = variation_df["client_id"].astype(str)
+    index = client_index(df_final_demo, df_final_experiment_clients)
+    if index is None:
+        # Repeated client_ids multiply the rows, which only the merges reproduce
+        new_df = pd.merge(df_final_demo, df_merged, how="left", on="client_id")
+        variation_df = pd.merge(new_df, df_final_experiment_clients, on="client_id", how="inner")
+        variation_df = variation_df.dropna(subset=["Variation"]).reset_index(drop=True)
+
+        # Adjust the data type of 'client_id' to string
+        variation_df["client_id"] = variation_df["client_id"].astype(str)
+    else:
+        # Keep the events of the experiment clients only, in their order
+        event_clients = lookup_clients(index, df_merged["client_id"])
+        events = np.flatnonzero(event_clients >= 0)
+        event_clients = event_clients[events]
+
+        # Then one empty row for each client without events, in profile order
+        no_events = np.flatnonzero(np.bincount(event_clients, minlength=len(index["client_ids"])) == 0)
+        no_events = no_events[np.argsort(index["demo_rows"][no_events])]
+        row_clients = np.concatenate([event_clients, no_events])
+        row_events = np.concatenate([events, np.full(len(no_events), -1, dtype=np.int64)])
+
+        # Attach the events, then the group and demographics of each row's client
+        demo_rows = index["demo_rows"][row_clients]
+        roster_rows = index["roster_rows"][row_clients]
+        # ('client_id' is converted to string once per client rather than on every row)
+        client_ids = pd.Series(index["client_ids"]).astype(str).array
+        columns = {column: client_ids.take(row_clients) if column == "client_id"
+                   else df_final_demo[column].array.take(demo_rows)
+                   for column in df_final_demo.columns}
+        for column in df_merged.columns.drop("client_id"):
+            columns[column] = df_merged[column].array.take(row_events, allow_fill=True)
+        for column in df_final_experiment_clients.columns.drop("client_id"):
+            columns[column] = df_final_experiment_clients[column].array.take(roster_rows)
+        variation_df = pd.DataFrame(columns)
+
+        # The events keep their order, and the rows without a visit come last,
+        # so the visit order of the footprints still holds
+        if is_visit_ordered(df_merged):
+            variation_df.attrs['sort_order'] = VISIT_ORDER
     
     return variation_df
 
@@ -411,31 +628,39 @@ def compare_age_distributions(control_df, test_df):
     plt.legend()
     plt.show()
 
-def analyze_time_spent(variation_df):
+def analyze_time_spent(variation_df, sessions=None):
     """
     This function analyzes the time spent on each step in the process, calculates the average time spent on each step,
     and plots the results.
 
     Parameters:
     variation_df (pd.DataFrame): The DataFrame containing the process steps and timestamps.
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize. When given, the averages are
+    read from it and variation_df is returned unchanged.
 
     Returns:
     tuple: A tuple containing the modified DataFrame with the 'time_spent' column and a summary DataFrame with the average time spent on each step.
     """
-    # Convert date_time to datetime format
-    variation_df['date_time'] = pd.to_datetime(variation_df['date_time'])
-    
-    # Sort by visit_id and date_time
-    variation_df = variation_df.sort_values(by=['visit_id', 'date_time'])
-    
-    # Calculate time spent on each step
-    variation_df['time_spent'] = variation_df.groupby('visit_id')['date_time'].diff().dt.total_seconds()
-    
-    # Fill NaN values in time_spent with 0 for the first step
-    variation_df['time_spent'] = variation_df['time_spent'].fillna(0)
-    
-    # Calculate average time spent on each step
-    time_spent_summary = variation_df.groupby('process_step')['time_spent'].mean().reset_index()
+    if sessions is not None:
+        # Read the average time spent on each step from the per-visit table
+        time_spent_summary = an.time_spent(sessions).time_spent_summary
+    else:
+        # Convert date_time to datetime format
+        variation_df['date_time'] = pd.to_datetime(variation_df['date_time'])
+        
+        # Sort by visit_id and date_time, unless the rows already are in that order
+        if is_visit_ordered(variation_df):
+            variation_df = variation_df.copy(deep=False)
+        else:
+            variation_df = variation_df.sort_values(by=VISIT_ORDER)
+            variation_df.attrs['sort_order'] = VISIT_ORDER
+        
+        # Calculate time spent on each step in one vectorized pass (0 for the first step of a visit)
+        is_first, dwell, prev_steps, is_back_track = vk.visit_kernel(*visit_arrays(variation_df))
+        variation_df['time_spent'] = dwell
+        
+        # Calculate average time spent on each step
+        time_spent_summary = variation_df.groupby('process_step')['time_spent'].mean().reset_index()
     print("Average Time Spent on Each Step:")
     print(time_spent_summary)
     
@@ -452,29 +677,35 @@ def analyze_time_spent(variation_df):
     
     return variation_df, time_spent_summary
 
-def analyze_session_durations(variation_df):
+def analyze_session_durations(variation_df, sessions=None):
     """
     This function calculates session durations for each visit_id, performs a t-test to compare control and test groups,
     and interprets the results.
 
     Parameters:
     variation_df (pd.DataFrame): The DataFrame containing the process steps and timestamps.
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize. When given, the session
+    durations are read from it instead of variation_df.
 
     Returns:
     tuple: A tuple containing the t-statistic and p-value of the t-test.
     """
-    # Calculate session duration for each visit_id
-    session_durations = variation_df.groupby('visit_id')['time_spent'].sum().reset_index()
+    if sessions is not None:
+        # Read the session durations and Variation labels from the per-visit table
+        df_merged = sessions[['visit_id', 'Variation', 'duration']].rename(columns={'duration': 'time_spent'})
+    else:
+        # Calculate session duration for each visit_id
+        session_durations = variation_df.groupby('visit_id')['time_spent'].sum().reset_index()
 
-    # Merge with the original data to get the Variation labels
-    df_merged = session_durations.merge(variation_df[['visit_id', 'Variation']].drop_duplicates(), on='visit_id')
+        # Merge with the original data to get the Variation labels
+        df_merged = session_durations.merge(variation_df[['visit_id', 'Variation']].drop_duplicates(), on='visit_id')
 
     # Separate the data into control and test groups
     control_group = df_merged[df_merged['Variation'] == 'Control']['time_spent']
     test_group = df_merged[df_merged['Variation'] == 'Test']['time_spent']
 
     # Perform t-test
-    t_stat, p_value = ttest_ind(test_group, control_group, alternative='greater')
+    t_stat, p_value = stats.ttest_ind(test_group, control_group, alternative='greater')
 
     # Output the results
     print(f"T-statistic: {t_stat}")
@@ -489,25 +720,31 @@ def analyze_session_durations(variation_df):
 
     return t_stat, p_value
 
-def calculate_completion_rate(variation_df):
+def count_completions(variation_df, sessions=None):
     """
-    This function calculates the total number of sessions and the number of sessions that reached the "confirm" step
-    for each group, then calculates the completion rate for each group.
+    This function counts the total number of sessions and the number of sessions that reached the "confirm" step
+    for each group, and calculates the completion rate for each group.
 
     Parameters:
     variation_df (pd.DataFrame): The DataFrame containing the process steps and variation labels.
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize. When given, the sessions
+    are counted from it instead of variation_df.
 
     Returns:
     pd.DataFrame: A DataFrame containing the total sessions, confirm sessions, and completion rate for each group.
     """
+    if sessions is not None:
+        # Count the sessions and the sessions that reached "confirm" from the per-visit table
+        return an.completion_table(sessions)
+
     # Total number of sessions for each group
-    total_sessions = variation_df.groupby('Variation')['visit_id'].nunique().reset_index(name='total_sessions')
+    total_sessions = variation_df.groupby('Variation', observed=True)['visit_id'].nunique().reset_index(name='total_sessions')
 
     # Filter the data to only include rows where process_step is "confirm"
     confirm_steps = variation_df[variation_df['process_step'] == 'confirm']
 
     # Count the number of sessions that reached the "confirm" step for each group
-    confirm_sessions = confirm_steps.groupby('Variation')['visit_id'].nunique().reset_index(name='confirm_sessions')
+    confirm_sessions = confirm_steps.groupby('Variation', observed=True)['visit_id'].nunique().reset_index(name='confirm_sessions')
 
     # Merge total sessions with confirm sessions
     completion_data = pd.merge(total_sessions, confirm_sessions, on='Variation')
@@ -515,35 +752,41 @@ def calculate_completion_rate(variation_df):
     # Calculate the completion rate
     completion_data['completion_rate'] = (completion_data['confirm_sessions'] / completion_data['total_sessions']) * 100
 
+    return completion_data
+
+def calculate_completion_rate(variation_df, sessions=None):
+    """
+    This function calculates the total number of sessions and the number of sessions that reached the "confirm" step
+    for each group, then calculates the completion rate for each group.
+
+    Parameters:
+    variation_df (pd.DataFrame): The DataFrame containing the process steps and variation labels.
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize (optional).
+
+    Returns:
+    pd.DataFrame: A DataFrame containing the total sessions, confirm sessions, and completion rate for each group.
+    """
+    # Count the sessions and calculate the completion rate
+    completion_data = count_completions(variation_df, sessions)
+
     print(completion_data)
     
     return completion_data
 
-def analyze_completion_rates(variation_df):
+def analyze_completion_rates(variation_df, sessions=None):
     """
     This function calculates the completion rates for each group, performs a z-test to compare the completion rates
     between the control and test groups, and plots the results.
 
     Parameters:
     variation_df (pd.DataFrame): The DataFrame containing the process steps and variation labels.
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize (optional).
 
     Returns:
     pd.DataFrame: A DataFrame containing the completion data and the z-test results.
     """
-    # Total number of sessions for each group
-    total_sessions = variation_df.groupby('Variation')['visit_id'].nunique().reset_index(name='total_sessions')
-
-    # Filter the data to only include rows where process_step is "confirm"
-    confirm_steps = variation_df[variation_df['process_step'] == 'confirm']
-
-    # Count the number of sessions that reached the "confirm" step for each group
-    confirm_sessions = confirm_steps.groupby('Variation')['visit_id'].nunique().reset_index(name='confirm_sessions')
-
-    # Merge total sessions with confirm sessions
-    completion_data = pd.merge(total_sessions, confirm_sessions, on='Variation')
-
-    # Calculate the completion rate
-    completion_data['completion_rate'] = (completion_data['confirm_sessions'] / completion_data['total_sessions']) * 100
+    # Count the sessions and calculate the completion rate
+    completion_data = count_completions(variation_df, sessions)
 
     # Extract data for z-test
     control_successes = completion_data[completion_data['Variation'] == 'Control']['confirm_sessions'].values[0]
@@ -556,7 +799,7 @@ def analyze_completion_rates(variation_df):
     count = [control_successes, test_successes]
     nobs = [control_total, test_total]
 
-    z_stat, p_value = proportions_ztest(count, nobs)
+    z_stat, p_value = smprop.proportions_ztest(count, nobs)
 
     # Check if the difference is statistically significant
     alpha = 0.05
@@ -647,25 +890,36 @@ def analyze_cost_effectiveness(variation_df, completion_data, threshold=5.0):
     print(f"Observed Increase in Completion Rate: {observed_increase:.2f}%")
 
 
-def analyze_session_durations_by_step(variation_df):
+def analyze_session_durations_by_step(variation_df, sessions=None):
     """
     This function analyzes the session durations by step for both control and test groups,
     performs t-tests to compare the durations, and plots the results.
 
     Parameters:
     variation_df (pd.DataFrame): The DataFrame containing the process steps and variation labels.
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize. When given, the averages
+    and Welch's t-tests are computed from its per-step counts, sums and sums of squares.
 
     Returns:
     pd.DataFrame: A DataFrame containing the t-test results for each process step.
     """
-    # Calculate average time spent on each step for the Control group
-    time_spent_summary_control = variation_df[variation_df['Variation'] == 'Control'].groupby('process_step')['time_spent'].mean().reset_index()
+    if sessions is not None:
+        # Read the time spent statistics and Welch's t-tests of each group and step from the per-visit table
+        step_result = an.session_durations_by_step(sessions)
+        step_stats = step_result.step_summary
+        time_spent_summary_control = step_stats.loc[step_stats['Variation'] == 'Control', ['process_step', 'time_spent']].reset_index(drop=True)
+        time_spent_summary_test = step_stats.loc[step_stats['Variation'] == 'Test', ['process_step', 'time_spent']].reset_index(drop=True)
+    else:
+        # Calculate average time spent on each step for the Control and Test groups
+        time_spent_summary_control = variation_df[variation_df['Variation'] == 'Control'].groupby('process_step')['time_spent'].mean().reset_index()
+        time_spent_summary_test = variation_df[variation_df['Variation'] == 'Test'].groupby('process_step')['time_spent'].mean().reset_index()
+
+    # Average time spent on each step for the Control group
     time_spent_summary_control['Variation'] = 'Control'
     print("Average Time Spent on Each Step (Control Group):")
     print(time_spent_summary_control)
     
-    # Calculate average time spent on each step for the Test group
-    time_spent_summary_test = variation_df[variation_df['Variation'] == 'Test'].groupby('process_step')['time_spent'].mean().reset_index()
+    # Average time spent on each step for the Test group
     time_spent_summary_test['Variation'] = 'Test'
     print("Average Time Spent on Each Step (Test Group):")
     print(time_spent_summary_test)
@@ -678,7 +932,7 @@ def analyze_session_durations_by_step(variation_df):
     combined_df['process_step'] = pd.Categorical(combined_df['process_step'], categories=step_order, ordered=True)
     combined_df = combined_df.sort_values('process_step').reset_index(drop=True)
     print("Combined DataFrame:")
-    display(combined_df)
+    print(combined_df)
     
     # Plotting
     plt.figure(figsize=(12, 6))
@@ -697,6 +951,13 @@ def analyze_session_durations_by_step(variation_df):
     # Show plot
     plt.show()
     
+    if sessions is not None:
+        # The t-tests were already performed from the per-visit table
+        ttest_results_df = step_result.ttest_results
+        print("T-test Results for Each Process Step:")
+        print(ttest_results_df)
+        return ttest_results_df
+    
     # Initialize list to store results
     results = []
     
@@ -706,7 +967,7 @@ def analyze_session_durations_by_step(variation_df):
         test_times = variation_df[(variation_df['Variation'] == 'Test') & (variation_df['process_step'] == step)]['time_spent']
         
         if not control_times.empty and not test_times.empty:
-            t_stat, p_value = ttest_ind(control_times, test_times, equal_var=False)
+            t_stat, p_value = stats.ttest_ind(control_times, test_times, equal_var=False)
             results.append({
                 'process_step': step,
                 'control_mean': control_times.mean(),
@@ -732,32 +993,44 @@ def analyze_session_durations_by_step(variation_df):
     
     return ttest_results_df
 
-def analyze_error_rates(variation_df):
+def analyze_error_rates(variation_df, sessions=None):
     """
     This function analyzes the error rates and retries for clients in both control and test groups,
     performs a chi-square test to compare the error rates, and plots the results.
 
     Parameters:
     variation_df (pd.DataFrame): The DataFrame containing the process steps and variation labels.
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize. When given, the event and
+    backtrack counts are read from it instead of variation_df, which then only supplies the rows of the clients
+    without a web footprint (counted as events without backward navigation); it may be None to count visits only.
 
     Returns:
     pd.DataFrame: A DataFrame containing the error rates for each group and the chi-square test results.
     """
-    # Sort the data by client_id, visit_id, and date_time
-    variation_df = variation_df.sort_values(by=['client_id', 'visit_id', 'date_time'])
-    
-    # Mapping process steps to numeric values
-    step_mapping = { 'start': 0, 'step_1': 1, 'step_2': 2, 'step_3': 3, 'confirm': 4 } 
-    variation_df['step_index'] = variation_df['process_step'].map(step_mapping)
-    
-    # Creating prev_step_index
-    variation_df['prev_step_index'] = variation_df.groupby('visit_id')['step_index'].shift(1)
-    
-    # Detect backward navigation
-    variation_df['is_back_track'] = variation_df['prev_step_index'] > variation_df['step_index']
+    if sessions is not None:
+        # Read the event and backtrack counts from the per-visit table; the rows of clients
+        # without a web footprint count as events without backward navigation, as below
+        no_visit = an.no_visit_rows(variation_df) if variation_df is not None else None
+        error_result = an.error_rates(sessions, no_visit=no_visit)
+        error_rates = error_result.error_rates
+        contingency_table = error_result.contingency_table
+    else:
+        # Sort the data by client_id, visit_id, and date_time, unless each visit already is in time order
+        if is_visit_ordered(variation_df):
+            variation_df = variation_df.copy(deep=False)
+        else:
+            variation_df = variation_df.sort_values(by=['client_id', 'visit_id', 'date_time'])
+        
+        # Detect backward navigation from the step index and the previous step index of each visit
+        is_first, dwell, prev_steps, is_back_track = vk.visit_kernel(*visit_arrays(variation_df))
+        variation_df['is_back_track'] = is_back_track
+        
+        # Calculate error rates
+        error_rates = variation_df.groupby('Variation', observed=True)['is_back_track'].mean().reset_index(name='Error Rate')
+        
+        # Create a contingency table
+        contingency_table = pd.crosstab(variation_df['Variation'], variation_df['is_back_track'])
     
-    # Calculate error rates
-    error_rates = variation_df.groupby('Variation')['is_back_track'].mean().reset_index(name='Error Rate')
     print("Error Rates:")
     print(error_rates)
     
@@ -773,11 +1046,8 @@ def analyze_error_rates(variation_df):
     # Show plot
     plt.show()
     
-    # Create a contingency table
-    contingency_table = pd.crosstab(variation_df['Variation'], variation_df['is_back_track'])
-    
     # Perform chi-square test
-    chi2, p, dof, ex = chi2_contingency(contingency_table)
+    chi2, p, dof, ex = stats.chi2_contingency(contingency_table)
     print(f"Chi-Square Test:\nChi2: {chi2}\np-value: {p}")
     
     # Return the error rates and chi-square test results
@@ -0,0 +1,188 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import kernels_vanguard as vk
+import sessions_vanguard as sv
+from lazy_vanguard import lazy_import
+
+# Statistics packages are imported on first use
+stats = lazy_import('scipy.stats')
+
+
+# Bin edges of the time-to-next-step histograms, in seconds
+TIME_BINS = [0, 5, 10, 30, 60, 120, 300, 600, 1800, np.inf]
+
+
+@dataclass
+class FunnelResult:
+    """
+    Step-transition counts and time-to-next-step statistics of each group, the conversion and drop-off
+    rates of each step, and the comparison of the Control and Test transitions out of each step.
+    """
+    transitions: pd.DataFrame
+    steps: pd.DataFrame
+    time_histograms: pd.DataFrame
+    comparison: pd.DataFrame
+
+    def matrix(self, variation):
+        """
+        This function returns the 5x5 transition count matrix of a group, from-step by to-step.
+        """
+        counts = self.transitions[self.transitions['Variation'] == variation]
+        return counts.pivot(index='from_step', columns='to_step', values='count').loc[sv.STEP_ORDER, sv.STEP_ORDER]
+
+def funnel_counts(variation_df):
+    """
+    This function counts, in one pass over the events, every step-to-step transition of every group,
+    together with the sum and sum of squares of the time to the next step and its histogram. Each
+    transition is encoded as (group * 5 + prev_code) * 5 + code and counted with np.bincount.
+
+    Parameters:
+    variation_df (pd.DataFrame): The events, with visit_id, date_time, process_step and Variation columns.
+
+    Returns:
+    dict: The group labels ('groups') and, indexed by group, from-step and to-step, the transition
+    'counts', 'time_sums', 'time_squares' and 'time_histograms'; the 'entries' and 'exits' of each
+    group and step.
+    """
+    # Rows without a visit are clients with no web footprint, they hold no events
+    has_visit = variation_df['visit_id'].notna()
+    if not has_visit.all():
+        variation_df = variation_df[has_visit]
+
+    # Sort by visit_id and date_time, unless the rows already are in that order
+    if not sv.is_visit_ordered(variation_df):
+        variation_df = variation_df.sort_values(by=sv.VISIT_ORDER)
+
+    visit_codes, times, steps = sv.visit_arrays(variation_df)
+    is_first, dwell, prev_steps, is_back_track = vk.visit_kernel(visit_codes, times, steps)
+    groups, labels = pd.factorize(variation_df['Variation'], sort=True)
+    n_groups, n_steps, n_bins = len(labels), len(sv.STEP_ORDER), len(TIME_BINS) - 1
+
+    # Transitions between known steps, with the time the step took
+    known = (prev_steps >= 0) & (steps >= 0) & (groups >= 0)
+    cell = (groups[known].astype(np.int64) * n_steps + prev_steps[known]) * n_steps + steps[known]
+    size = n_groups * n_steps * n_steps
+    time = dwell[known]
+    time_bin = np.searchsorted(TIME_BINS, time, side='right') - 1
+    shape = (n_groups, n_steps, n_steps)
+
+    # Steps the visits start and end on
+    is_last = np.append(is_first[1:], True)
+    entry = is_first & (steps >= 0) & (groups >= 0)
+    exit = is_last & (steps >= 0) & (groups >= 0)
+
+    return {
+        'groups': list(labels.astype(str)),
+        'counts': np.bincount(cell, minlength=size).reshape(shape),
+        'time_sums': np.bincount(cell, weights=time, minlength=size).reshape(shape),
+        'time_squares': np.bincount(cell, weights=time ** 2, minlength=size).reshape(shape),
+        'time_histograms': np.bincount(cell * n_bins + time_bin, minlength=size * n_bins).reshape(shape + (n_bins,)),
+        'entries': np.bincount(groups[entry] * n_steps + steps[entry], minlength=n_groups * n_steps).reshape(n_groups, n_steps),
+        'exits': np.bincount(groups[exit] * n_steps + steps[exit], minlength=n_groups * n_steps).reshape(n_groups, n_steps),
+    }
+
+def compare_transitions(counts, exits):
+    """
+    This function tests, for every from-step, whether the Control and Test groups move on to the
+    same next steps (or leave) in the same proportions, with a chi-square test of homogeneity on the
+    2 x 6 table of next states. The per-step statistics and degrees of freedom are summed into an
+    overall test of equal transition matrices.
+
+    Parameters:
+    counts (np.ndarray): The transition counts of the Control and Test groups, of shape (2, 5, 5).
+    exits (np.ndarray): The exits of the Control and Test groups, of shape (2, 5).
+
+    Returns:
+    pd.DataFrame: The chi-square statistic, degrees of freedom and p-value of each from-step and overall.
+    """
+    # Observed tables of shape (from-steps, 2 groups, 6 next states)
+    observed = np.concatenate([counts, exits[:, :, None]], axis=2).transpose(1, 0, 2).astype(float)
+    expected = observed.sum(axis=2, keepdims=True) * observed.sum(axis=1, keepdims=True) \
+        / observed.sum(axis=(1, 2), keepdims=True).clip(min=1)
+
+    # Next states no visit of either group went to carry no information
+    used = expected.sum(axis=1) > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        chi2 = np.where(expected > 0, (observed - expected) ** 2 / expected, 0).sum(axis=(1, 2))
+    dof = (used.sum(axis=1) - 1).clip(min=0)
+    both = (observed.sum(axis=2) > 0).all(axis=1)
+    chi2, dof = np.where(both, chi2, np.nan), np.where(both, dof, 0)
+
+    comparison = pd.DataFrame({'from_step': sv.STEP_ORDER, 'chi2': chi2, 'dof': dof})
+    comparison.loc[len(comparison)] = ['all', np.nansum(chi2), dof.sum()]
+    with np.errstate(invalid='ignore'):
+        comparison['p_value'] = np.where(comparison['dof'] > 0,
+                                         stats.chi2.sf(comparison['chi2'], comparison['dof'].clip(lower=1)), np.nan)
+
+    return comparison
+
+def funnel(variation_df):
+    """
+    This function builds the funnel of every group: the transition counts and rates between the steps
+    start, step_1, step_2, step_3 and confirm, the conversion (on to the next step of the process) and
+    drop-off (end of the visit) rates of each step, the time-to-next-step statistics and histograms, and
+    the chi-square comparison of the Control and Test transitions.
+
+    Parameters:
+    variation_df (pd.DataFrame): The events, with visit_id, date_time, process_step and Variation columns.
+
+    Returns:
+    FunnelResult: The transitions, steps, time histograms and comparison DataFrames.
+    """
+    funnel_data = funnel_counts(variation_df)
+    groups, counts, exits = funnel_data['groups'], funnel_data['counts'], funnel_data['exits']
+    n_groups, n_steps = counts.shape[:2]
+
+    # Every departure from a step: a move to a step or the end of the visit
+    departures = counts.sum(axis=2) + exits
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_time = funnel_data['time_sums'] / counts
+        std_time = np.sqrt(np.maximum(funnel_data['time_squares'] - funnel_data['time_sums'] * mean_time, 0)
+                           / (counts - 1))
+        rate = counts / departures[:, :, None]
+
+        # Conversion to the next step of the process, and drop-off at each step
+        forward = np.zeros((n_groups, n_steps))
+        forward[:, :-1] = counts[:, np.arange(n_steps - 1), np.arange(1, n_steps)]
+        conversion_rate = np.where(np.arange(n_steps) < n_steps - 1, forward / departures, np.nan)
+        drop_off_rate = exits / departures
+
+    # One row per group, from-step and to-step
+    grid = dict(Variation=np.repeat(groups, n_steps * n_steps),
+                from_step=np.tile(np.repeat(sv.STEP_ORDER, n_steps), n_groups),
+                to_step=np.tile(sv.STEP_ORDER, n_groups * n_steps))
+    transitions = pd.DataFrame({**grid, 'count': counts.ravel(), 'rate': rate.ravel(),
+                                'mean_time': mean_time.ravel(), 'std_time': std_time.ravel()})
+
+    steps = pd.DataFrame({
+        'Variation': np.repeat(groups, n_steps),
+        'process_step': np.tile(sv.STEP_ORDER, n_groups),
+        'entries': funnel_data['entries'].ravel(),
+        'departures': departures.ravel(),
+        'exits': exits.ravel(),
+        'conversion_rate': conversion_rate.ravel(),
+        'drop_off_rate': drop_off_rate.ravel(),
+    })
+
+    bins = [f'{low:g}-{high:g}s' if np.isfinite(high) else f'{low:g}s+' for low, high in zip(TIME_BINS[:-1], TIME_BINS[1:])]
+    time_histograms = pd.concat([pd.DataFrame(grid),
+                                 pd.DataFrame(funnel_data['time_histograms'].reshape(-1, len(bins)), columns=bins)],
+                                axis=1)
+
+    # Compare the groups only when both are there
+    if {'Control', 'Test'} <= set(groups):
+        pair = [groups.index('Control'), groups.index('Test')]
+        comparison = compare_transitions(counts[pair], exits[pair])
+    else:
+        comparison = pd.DataFrame(columns=['from_step', 'chi2', 'dof', 'p_value'])
+
+    for frame in (transitions, steps, time_histograms):
+        for column in ('from_step', 'to_step', 'process_step'):
+            if column in frame:
+                frame[column] = pd.Categorical(frame[column], categories=sv.STEP_ORDER, ordered=True)
+
+    return FunnelResult(transitions, steps, time_histograms, comparison)
@@ -0,0 +1,251 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+import cache_vanguard as cv
+import functions_vanguard as vd
+import sessions_vanguard as sv
+from lazy_vanguard import lazy_import
+
+# Statistics packages are imported on first use
+st = lazy_import('scipy.stats')
+smprop = lazy_import('statsmodels.stats.proportion')
+
+
+# Default directory of the incremental state
+STATE_DIR = os.path.join(cv.CACHE_DIR, "incremental")
+
+# Sufficient statistics kept per Variation
+STAT_COLUMNS = ['sessions', 'confirms', 'duration_sum', 'duration_sq_sum', 'events', 'backtracks']
+
+# Per-visit state kept for visits that may continue in the next shard
+OPEN_VISIT_COLUMNS = ['visit_id', 'client_id', 'Variation', 'start_time', 'end_time', 'n_events',
+                      'first_step', 'last_step', 'reached_confirm', 'backtracks']
+
+# A visit with no event for this long before the latest event seen is considered finished
+VISIT_TIMEOUT = pd.Timedelta(minutes=30)
+
+
+def empty_state():
+    """
+    This function creates the incremental state of an experiment with no data yet.
+
+    Returns:
+    dict: The sufficient statistics per Variation ('stats'), the visits still open ('open_visits')
+    and the content hashes of the shards already folded in ('processed').
+    """
+    return {
+        'stats': pd.DataFrame(columns=STAT_COLUMNS, dtype=float).rename_axis('Variation'),
+        'open_visits': pd.DataFrame(columns=OPEN_VISIT_COLUMNS),
+        'processed': [],
+    }
+
+def fold_visits(stats, visits):
+    """
+    This function adds finished visits to the sufficient statistics of each Variation.
+
+    Parameters:
+    stats (pd.DataFrame): The sufficient statistics, indexed by Variation.
+    visits (pd.DataFrame): The finished visits, with the OPEN_VISIT_COLUMNS columns.
+
+    Returns:
+    pd.DataFrame: The updated sufficient statistics.
+    """
+    duration = (visits['end_time'] - visits['start_time']).dt.total_seconds()
+    increments = pd.DataFrame({
+        'sessions': 1,
+        'confirms': visits['reached_confirm'].astype(int),
+        'duration_sum': duration,
+        'duration_sq_sum': duration ** 2,
+        'events': visits['n_events'],
+        'backtracks': visits['backtracks'],
+    }).groupby(visits['Variation'].astype(str)).sum()
+
+    return stats.add(increments.astype(float), fill_value=0)
+
+def update_state(state, web_data, experiment_clients, timeout=VISIT_TIMEOUT):
+    """
+    This function folds a new shard of web footprint events into the incremental state.
+    Events of a visit that was still open are appended to it; the dwell and backtrack across the
+    shard boundary are taken from the last step of the open visit. Visits without an event within
+    the timeout of the latest event seen are then closed and added to the sufficient statistics.
+
+    The shard must only hold events later than those already folded in for the same visits.
+
+    Parameters:
+    state (dict): The incremental state, from empty_state or load_state.
+    web_data (pd.DataFrame): The new web footprint events.
+    experiment_clients (pd.DataFrame): The experiment roster with client_id and Variation columns.
+    timeout (pd.Timedelta): The inactivity after which a visit is considered finished (default is 30 minutes).
+
+    Returns:
+    dict: The updated incremental state.
+    """
+    # Attach the experiment group of each event, dropping clients outside the experiment
+    roster = experiment_clients.set_index('client_id')['Variation']
+    events = web_data.assign(Variation=web_data['client_id'].map(roster)).dropna(subset=['Variation'])
+    if events.empty:
+        return state
+
+    # Per-visit aggregates of the new shard
+    new_visits = sv.sessionize(events)[OPEN_VISIT_COLUMNS]
+    new_visits['visit_id'] = new_visits['visit_id'].astype(str)
+    new_visits['Variation'] = new_visits['Variation'].astype(str)
+    new_visits = new_visits.set_index('visit_id')
+    latest_time = new_visits['end_time'].max()
+
+    visits = new_visits
+    open_visits = state['open_visits'].set_index('visit_id')
+    if len(open_visits):
+        # Continue the visits that were still open at the end of the previous shard
+        carried = new_visits.index.intersection(open_visits.index)
+        before, after = open_visits.loc[carried], new_visits.loc[carried]
+        crossing_back_track = (before['last_step'] > after['first_step']) & (after['first_step'] >= 0)
+        new_visits.loc[carried, 'start_time'] = before['start_time']
+        new_visits.loc[carried, 'first_step'] = before['first_step']
+        new_visits.loc[carried, 'n_events'] = before['n_events'] + after['n_events']
+        new_visits.loc[carried, 'reached_confirm'] = before['reached_confirm'].astype(bool) | after['reached_confirm']
+        new_visits.loc[carried, 'backtracks'] = before['backtracks'] + after['backtracks'] + crossing_back_track
+
+        visits = pd.concat([open_visits.drop(carried).astype(new_visits.dtypes.to_dict()), new_visits])
+
+    # Close the visits that went quiet and keep the others open
+    is_open = visits['end_time'] >= latest_time - timeout
+    state['stats'] = fold_visits(state['stats'], visits[~is_open])
+    state['open_visits'] = visits[is_open].reset_index()
+
+    return state
+
+def close_open_visits(state):
+    """
+    This function closes every visit still open, e.g. once the experiment has ended.
+
+    Parameters:
+    state (dict): The incremental state.
+
+    Returns:
+    dict: The incremental state with no open visit left.
+    """
+    if len(state['open_visits']):
+        state['stats'] = fold_visits(state['stats'], state['open_visits'])
+    state['open_visits'] = state['open_visits'].iloc[:0]
+
+    return state
+
+def save_state(state, state_dir=STATE_DIR):
+    """
+    This function writes the incremental state to disk.
+
+    Parameters:
+    state (dict): The incremental state.
+    state_dir (str): The directory of the incremental state.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    feather.write_feather(state['stats'].reset_index(), os.path.join(state_dir, "stats.feather"))
+    feather.write_feather(state['open_visits'].reset_index(drop=True), os.path.join(state_dir, "open_visits.feather"))
+    with open(os.path.join(state_dir, "processed.txt"), "w") as f:
+        f.write("\n".join(state['processed']))
+
+def load_state(state_dir=STATE_DIR):
+    """
+    This function reads the incremental state from disk.
+
+    Parameters:
+    state_dir (str): The directory of the incremental state.
+
+    Returns:
+    dict: The incremental state, or an empty state if none was saved yet.
+    """
+    if not os.path.exists(os.path.join(state_dir, "stats.feather")):
+        return empty_state()
+
+    with open(os.path.join(state_dir, "processed.txt")) as f:
+        processed = f.read().split()
+
+    return {
+        'stats': feather.read_feather(os.path.join(state_dir, "stats.feather")).set_index('Variation'),
+        'open_visits': feather.read_feather(os.path.join(state_dir, "open_visits.feather")),
+        'processed': processed,
+    }
+
+def update_from_files(file_paths, experiment_clients, state_dir=STATE_DIR, timeout=VISIT_TIMEOUT):
+    """
+    This function folds the web footprint files that were not processed yet into the saved
+    incremental state, one file at a time, and saves the state after each file.
+
+    Parameters:
+    file_paths (list of str): The paths of the web footprint files, oldest first.
+    experiment_clients (pd.DataFrame): The experiment roster with client_id and Variation columns.
+    state_dir (str): The directory of the incremental state.
+    timeout (pd.Timedelta): The inactivity after which a visit is considered finished.
+
+    Returns:
+    dict: The updated incremental state.
+    """
+    state = load_state(state_dir)
+
+    for file_path in file_paths:
+        # Skip the files whose content was already folded in
+        key = cv.hash_source_files([file_path])
+        if key in state['processed']:
+            continue
+
+        state = update_state(state, vd.import_web_data(file_path), experiment_clients, timeout)
+        state['processed'].append(key)
+        save_state(state, state_dir)
+
+    return state
+
+def completion_ztest(state):
+    """
+    This function performs the z-test of analyze_completion_rates from the sufficient statistics.
+
+    Parameters:
+    state (dict): The incremental state.
+
+    Returns:
+    tuple: The z-statistic and p-value.
+    """
+    stats = state['stats']
+    count = [stats.loc['Control', 'confirms'], stats.loc['Test', 'confirms']]
+    nobs = [stats.loc['Control', 'sessions'], stats.loc['Test', 'sessions']]
+
+    return smprop.proportions_ztest(count, nobs)
+
+def duration_ttest(state):
+    """
+    This function performs the t-test of analyze_session_durations (Test longer than Control)
+    from the sufficient statistics.
+
+    Parameters:
+    state (dict): The incremental state.
+
+    Returns:
+    tuple: The t-statistic and p-value.
+    """
+    stats = state['stats']
+    n = stats['sessions']
+    mean = stats['duration_sum'] / n
+    std = np.sqrt((stats['duration_sq_sum'] - stats['duration_sum'] * mean) / (n - 1))
+
+    return st.ttest_ind_from_stats(mean['Test'], std['Test'], n['Test'],
+                                   mean['Control'], std['Control'], n['Control'],
+                                   alternative='greater')
+
+def error_rate_chi2(state):
+    """
+    This function performs the chi-square test of analyze_error_rates from the sufficient statistics.
+
+    Parameters:
+    state (dict): The incremental state.
+
+    Returns:
+    tuple: The chi-square statistic and p-value.
+    """
+    stats = state['stats'].loc[['Control', 'Test']]
+    contingency_table = np.column_stack([stats['events'] - stats['backtracks'], stats['backtracks']])
+
+    chi2, p, dof, ex = st.chi2_contingency(contingency_table)
+    return chi2, p
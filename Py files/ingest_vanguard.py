@@ -0,0 +1,107 @@
+import glob
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+import functions_vanguard as vd
+
+
+# Default configuration file, at the root of the project
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "vanguard.yaml")
+
+# Configuration keys of the single-file datasets
+DEMO_KEY = "path_for_final_demo_df"
+EXPERIMENT_CLIENTS_KEY = "path_for_final_experiment_clients"
+
+# Configuration keys of the web footprint shards: path_for_final_web_data_pt_1, _pt_2, ...
+WEB_DATA_KEY = re.compile(r"^path_for_final_web_data_pt_(\d+)$")
+
+
+def load_config(config_path=CONFIG_PATH):
+    """
+    This function reads the dataset configuration and resolves every path relative to the
+    directory of the configuration file.
+
+    Parameters:
+    config_path (str): The path of the YAML configuration file (default is vanguard.yaml).
+
+    Returns:
+    dict: The configuration with absolute paths.
+    """
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    return {key: os.path.join(base_dir, value) for key, value in config.items()}
+
+def web_data_paths(config):
+    """
+    This function lists the web footprint shards of the configuration in shard order.
+    A shard path may be a glob pattern, which is expanded in sorted order.
+
+    Parameters:
+    config (dict): The configuration returned by load_config.
+
+    Returns:
+    list of str: The paths of the web footprint shards.
+    """
+    # Order the shard keys by shard number, not alphabetically (pt_10 comes after pt_9)
+    shard_keys = sorted((key for key in config if WEB_DATA_KEY.match(key)),
+                        key=lambda key: int(WEB_DATA_KEY.match(key).group(1)))
+
+    paths = []
+    for key in shard_keys:
+        matches = sorted(glob.glob(config[key]))
+        paths.extend(matches if matches else [config[key]])
+
+    return paths
+
+def source_paths(config):
+    """
+    This function lists every source file of the configuration, in a stable order.
+
+    Parameters:
+    config (dict): The configuration returned by load_config.
+
+    Returns:
+    list of str: The paths of the demo file, the web footprint shards and the experiment roster.
+    """
+    return [config[DEMO_KEY], *web_data_paths(config), config[EXPERIMENT_CLIENTS_KEY]]
+
+def ingest(config_path=CONFIG_PATH, max_workers=None, config=None):
+    """
+    This function loads every dataset listed in the configuration concurrently in a thread pool.
+    The C parser releases the GIL while it tokenizes and converts the numeric columns, so that part
+    of the shards overlaps across cores; building the string and object columns holds the GIL, so
+    only part of the work runs in parallel. Threads avoid pickling the DataFrames between processes.
+
+    Parameters:
+    config_path (str): The path of the YAML configuration file (default is vanguard.yaml).
+    max_workers (int): The number of loader threads (default is one per dataset, capped at the CPU count).
+    config (dict): The configuration already returned by load_config (default is to read config_path).
+
+    Returns:
+    dict: The 'demo' and 'experiment_clients' DataFrames and the list of 'web_data' shards.
+    """
+    if config is None:
+        config = load_config(config_path)
+    shard_paths = web_data_paths(config)
+
+    if max_workers is None:
+        max_workers = min(len(shard_paths) + 2, os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Submit every dataset at once
+        demo = pool.submit(vd.import_dataframe, config[DEMO_KEY], vd.DEMO_DTYPES)
+        experiment_clients = pool.submit(vd.import_dataframe, config[EXPERIMENT_CLIENTS_KEY],
+                                         vd.EXPERIMENT_CLIENTS_DTYPES)
+        shards = [pool.submit(vd.import_web_data, path) for path in shard_paths]
+
+        # Collect the results in the configured order
+        return {
+            "demo": demo.result(),
+            "web_data": [shard.result() for shard in shards],
+            "experiment_clients": experiment_clients.result(),
+        }
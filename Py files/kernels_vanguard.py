@@ -0,0 +1,86 @@
+import importlib.util
+
+import numpy as np
+
+
+# Numba is optional and only imported when the compiled loop is first used
+HAS_NUMBA = importlib.util.find_spec("numba") is not None
+
+# Compiled visit loop, built on first use
+_visit_kernel_loop = None
+
+
+def visit_kernel(visit_codes, times, steps, use_numba=None):
+    """
+    This function computes, in one vectorized pass over events sorted by visit and time, the dwell time,
+    the previous step and the backtrack flag of every event.
+
+    The events of a visit must be contiguous and in time order. A new visit starts wherever the visit code
+    changes; events with a negative visit code (no visit) are treated as visits of their own.
+
+    Parameters:
+    visit_codes (np.ndarray): The integer code of each event's visit, e.g. from pd.factorize.
+    times (np.ndarray): The int64 timestamps of the events, in nanoseconds.
+    steps (np.ndarray): The int8 step codes of the events (-1 for unknown steps).
+    use_numba (bool): Whether to run the compiled loop (default is to use Numba when it is installed).
+
+    Returns:
+    tuple: The boolean first-event-of-visit flags, the dwell times in seconds (zero on the first event),
+    the int8 previous step codes (-1 on the first event) and the boolean backtrack flags.
+    """
+    visit_codes = np.ascontiguousarray(visit_codes)
+    times = np.ascontiguousarray(times, dtype=np.int64)
+    steps = np.ascontiguousarray(steps, dtype=np.int8)
+
+    if use_numba is None:
+        use_numba = HAS_NUMBA
+    if use_numba:
+        return _visit_kernel_numba(visit_codes, times, steps)
+
+    # A new visit starts wherever the visit code changes
+    is_first = np.ones(len(visit_codes), dtype=bool)
+    is_first[1:] = visit_codes[1:] != visit_codes[:-1]
+    is_first |= visit_codes < 0
+
+    # Seconds since the previous event of the same visit
+    dwell = np.zeros(len(times))
+    dwell[1:] = (times[1:] - times[:-1]) / 1e9
+    dwell[is_first] = 0.0
+
+    # Step of the previous event of the same visit, and backward navigation
+    prev_steps = np.full(len(steps), -1, dtype=np.int8)
+    prev_steps[1:] = steps[:-1]
+    prev_steps[is_first] = -1
+    is_back_track = (prev_steps > steps) & (steps >= 0)
+
+    return is_first, dwell, prev_steps, is_back_track
+
+def _visit_loop(visit_codes, times, steps, is_first, dwell, prev_steps, is_back_track):
+    for i in range(len(visit_codes)):
+        if i == 0 or visit_codes[i] < 0 or visit_codes[i] != visit_codes[i - 1]:
+            is_first[i] = True
+            dwell[i] = 0.0
+            prev_steps[i] = -1
+            is_back_track[i] = False
+        else:
+            is_first[i] = False
+            dwell[i] = (times[i] - times[i - 1]) / 1e9
+            prev_steps[i] = steps[i - 1]
+            is_back_track[i] = steps[i] >= 0 and steps[i - 1] > steps[i]
+
+def _visit_kernel_numba(visit_codes, times, steps):
+    """
+    This function runs visit_kernel as a single compiled loop, which avoids its temporary arrays.
+    """
+    global _visit_kernel_loop
+    if _visit_kernel_loop is None:
+        import numba
+        _visit_kernel_loop = numba.njit(cache=True)(_visit_loop)
+
+    n = len(visit_codes)
+    is_first = np.empty(n, dtype=np.bool_)
+    dwell = np.empty(n)
+    prev_steps = np.empty(n, dtype=np.int8)
+    is_back_track = np.empty(n, dtype=np.bool_)
+    _visit_kernel_loop(visit_codes, times, steps, is_first, dwell, prev_steps, is_back_track)
+    return is_first, dwell, prev_steps, is_back_track
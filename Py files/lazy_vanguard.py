@@ -0,0 +1,40 @@
+import importlib
+import sys
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on the first attribute access, so that heavy
+    plotting and statistics packages only cost import time in the code paths that use them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    This function returns a module that is imported on first use.
+
+    Parameters:
+    name (str): The full name of the module, e.g. 'matplotlib.pyplot'.
+
+    Returns:
+    module or LazyModule: The module itself if it was already imported, otherwise a lazy stand-in.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
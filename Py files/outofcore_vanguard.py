@@ -0,0 +1,270 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import analysis_vanguard as an
+import cache_vanguard as cv
+import functions_vanguard as vd
+import sessions_vanguard as sv
+import store_vanguard as vs
+import summary_vanguard as sm
+
+
+# Default directory of the event partitions
+PARTITION_DIR = os.path.join(cv.CACHE_DIR, "partitions")
+
+# Default number of partitions; each one must fit in memory with its per-visit table
+DEFAULT_PARTITIONS = 64
+
+# Columns of the web footprint files the partitions keep
+PARTITION_USECOLS = ['client_id', 'visit_id', 'process_step', 'date_time']
+
+# Schema of the partition files: integer codes and the visit id, without the demographics
+PARTITION_SCHEMA = pa.schema([
+    ('client_id', pa.int64()),
+    ('visit_id', pa.string()),
+    ('step', pa.int8()),
+    ('date_time', pa.int64()),
+    ('Variation', pa.int8()),
+])
+
+# Per-visit measures summed per group in every partition
+TOTAL_COLUMNS = ['sessions', 'confirms', 'duration_sum', 'duration_sq_sum', 'n_events', 'backtracks'] + vs.STEP_COLUMNS
+
+
+def experiment_roster(df_final_demo, df_final_experiment_clients):
+    """
+    This function lists the clients kept by merge_and_clean_dataframes (in the client profiles and
+    in the experiment roster, with a group) and the code of their group.
+
+    Parameters:
+    df_final_demo (pd.DataFrame): The client profiles.
+    df_final_experiment_clients (pd.DataFrame): The experiment roster with client_id and Variation columns.
+
+    Returns:
+    pd.Series: The int8 Variation code of each client, indexed by client_id.
+    """
+    roster = df_final_experiment_clients.dropna(subset=['Variation']).drop_duplicates('client_id')
+    roster = roster[roster['client_id'].isin(df_final_demo['client_id'])]
+    codes = pd.Categorical(roster['Variation'], dtype=vd.VARIATION_DTYPE).codes.astype(np.int8)
+
+    return pd.Series(codes, index=pd.Index(roster['client_id'].astype(np.int64), name='client_id'))
+
+def partition_events(file_paths, roster, partition_dir=PARTITION_DIR, n_partitions=DEFAULT_PARTITIONS,
+                     chunksize=500_000):
+    """
+    This function streams the web footprint files in chunks and spreads the events of the experiment
+    clients over partition files by a hash of their visit_id, so that every visit lies whole in one
+    partition. Only one chunk is in memory at a time. The rows merge_and_clean_dataframes would give the
+    experiment clients without a visit (their events without a visit_id, or one row for a client without
+    any event) are counted on the way.
+
+    Parameters:
+    file_paths (list of str): The paths of the web footprint files.
+    roster (pd.Series): The Variation code of each client, from experiment_roster.
+    partition_dir (str): The directory of the partition files; earlier partitions there are replaced.
+    n_partitions (int): The number of partitions (default is 64).
+    chunksize (int): The number of rows read per chunk (default is 500,000).
+
+    Returns:
+    tuple: The paths of the partition files, and the rows without a visit of each client in the format
+    of analysis_vanguard.no_visit_rows.
+    """
+    os.makedirs(partition_dir, exist_ok=True)
+    for old_path in glob.glob(os.path.join(partition_dir, "part_*.arrow")):
+        os.remove(old_path)
+
+    paths = [os.path.join(partition_dir, f"part_{number:04d}.arrow") for number in range(n_partitions)]
+    writers = [pa.ipc.new_file(path, PARTITION_SCHEMA) for path in paths]
+    event_rows = np.zeros(len(roster), dtype=np.int64)
+    no_visit_rows = np.zeros(len(roster), dtype=np.int64)
+    try:
+        for file_path in file_paths:
+            reader = pd.read_csv(file_path, usecols=PARTITION_USECOLS, chunksize=chunksize,
+                                 dtype={'client_id': 'int64', 'visit_id': 'str', 'process_step': 'str'})
+            for chunk in reader:
+                # Count the events and the events without a visit of each experiment client
+                variation = roster.reindex(chunk['client_id']).to_numpy()
+                in_roster = ~np.isnan(variation)
+                has_visit = chunk['visit_id'].notna().to_numpy()
+                positions = roster.index.get_indexer(chunk['client_id'].to_numpy()[in_roster])
+                event_rows += np.bincount(positions, minlength=len(roster))
+                no_visit_rows += np.bincount(positions[~has_visit[in_roster]], minlength=len(roster))
+
+                # Keep the events with a visit of the experiment clients
+                keep = in_roster & has_visit
+                chunk = chunk[keep]
+
+                visit_ids = chunk['visit_id'].to_numpy(dtype=object)
+                partition = pd.util.hash_array(visit_ids) % np.uint64(n_partitions)
+                order = np.argsort(partition, kind='stable')
+                bounds = np.searchsorted(partition[order], np.arange(n_partitions + 1))
+
+                batch = pa.record_batch([
+                    pa.array(chunk['client_id'].to_numpy()[order]),
+                    pa.array(visit_ids[order], type=pa.string()),
+                    pa.array(sv.step_codes(chunk['process_step'])[order]),
+                    pa.array(pd.to_datetime(chunk['date_time'], format=vd.WEB_DATA_DATE_FORMAT)
+                             .to_numpy(dtype='datetime64[ns]').view(np.int64)[order]),
+                    pa.array(variation[keep][order].astype(np.int8)),
+                ], schema=PARTITION_SCHEMA)
+
+                # Append each partition's slice of the chunk to its file
+                for number, writer in enumerate(writers):
+                    if bounds[number + 1] > bounds[number]:
+                        writer.write_batch(batch.slice(bounds[number], bounds[number + 1] - bounds[number]))
+    finally:
+        for writer in writers:
+            writer.close()
+
+    # A client without any event has one row, without a visit
+    no_visit_rows += event_rows == 0
+    has_rows = no_visit_rows > 0
+    no_visit = pd.Series(no_visit_rows[has_rows], index=pd.MultiIndex.from_arrays(
+        [pd.Categorical.from_codes(roster.to_numpy()[has_rows], dtype=vd.VARIATION_DTYPE).astype(str),
+         roster.index[has_rows].astype(str)], names=['Variation', 'client_id']))
+
+    return paths, no_visit.sort_index()
+
+def read_partition(partition_path):
+    """
+    This function reads a partition file back into the event columns sessions_vanguard.sessionize reads.
+
+    Parameters:
+    partition_path (str): The path of the partition file.
+
+    Returns:
+    pd.DataFrame: The events of the partition, sorted by visit and time.
+    """
+    with pa.memory_map(partition_path) as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    events = pd.DataFrame({
+        'visit_id': table.column('visit_id').to_pandas().astype('category'),
+        'client_id': table.column('client_id').to_numpy(),
+        'Variation': pd.Categorical.from_codes(table.column('Variation').to_numpy(), dtype=vd.VARIATION_DTYPE),
+        'date_time': table.column('date_time').to_numpy().view('datetime64[ns]'),
+        'process_step': pd.Categorical.from_codes(table.column('step').to_numpy(), categories=sv.STEP_ORDER,
+                                                  ordered=True),
+    })
+    events = events.sort_values(by=sv.VISIT_ORDER, ignore_index=True)
+    events.attrs['sort_order'] = sv.VISIT_ORDER
+
+    return events
+
+def partition_aggregates(events):
+    """
+    This function sessionizes the events of one partition and reduces them to the aggregates that
+    are combined across partitions: the sums of the per-visit measures of each group and the
+    per-client sums.
+
+    Parameters:
+    events (pd.DataFrame): The events of the partition, from read_partition.
+
+    Returns:
+    tuple: The TOTAL_COLUMNS sums indexed by Variation, and the per-client sums of analysis_vanguard.client_table.
+    """
+    sessions = sv.sessionize(events)
+
+    duration = sessions['duration']
+    measures = pd.DataFrame({
+        'sessions': 1,
+        'confirms': sessions['reached_confirm'].astype(np.int64),
+        'duration_sum': duration,
+        'duration_sq_sum': duration ** 2,
+        'n_events': sessions['n_events'].astype(np.int64),
+        'backtracks': sessions['backtracks'],
+    })
+    for column in vs.STEP_COLUMNS:
+        measures[column] = sessions[column]
+    totals = measures.groupby(sessions['Variation'].astype(str)).sum()
+
+    return totals, an.client_table(sessions)
+
+def partition_file_aggregates(partition_path):
+    """
+    This function reads one partition file and reduces it with partition_aggregates.
+    """
+    return partition_aggregates(read_partition(partition_path))
+
+def report_from_aggregates(totals, clients, alpha=an.ALPHA, threshold=5.0, no_visit=None):
+    """
+    This function runs every hypothesis of the experiment from the combined aggregates.
+
+    Parameters:
+    totals (pd.DataFrame): The TOTAL_COLUMNS sums of each group, indexed by Variation.
+    clients (pd.DataFrame): The per-client sums, indexed by Variation and client_id.
+    alpha (float): The significance level (default is 0.05).
+    threshold (float): The cost-effectiveness threshold (default is 5%).
+    no_visit (pd.Series): The rows without a visit of each client, in the format of
+    analysis_vanguard.no_visit_rows with str labels (default is none).
+
+    Returns:
+    ExperimentReport: The results of every hypothesis.
+    """
+    # Count the rows without a visit as analyze_error_rates and analyze_cost_effectiveness do
+    if no_visit is not None:
+        totals = totals.assign(no_visit_rows=an.no_visit_totals(no_visit).reindex(totals.index, fill_value=0))
+        clients = an.add_no_visit_rows(clients, no_visit)
+
+    summary = vs.summary_from_totals(totals)
+    completion = sm.completion_rates(summary, alpha)
+
+    return an.ExperimentReport(
+        time_spent=an.TimeSpentResult(sv.summarize_step_dwell(totals)[['process_step', 'time_spent']]),
+        completion=completion,
+        cost_effectiveness=an.cost_effectiveness_test(clients, completion, threshold, alpha),
+        completion_lift=an.completion_lift_test(clients, threshold, alpha),
+        durations=sm.session_durations(summary, alpha),
+        durations_by_step=sm.session_durations_by_step(summary),
+        error_rates=sm.error_rates(summary, alpha),
+    )
+
+def analyze_out_of_core(file_paths, df_final_demo, df_final_experiment_clients, partition_dir=PARTITION_DIR,
+                        n_partitions=DEFAULT_PARTITIONS, alpha=an.ALPHA, threshold=5.0, max_workers=1):
+    """
+    This function runs the analyses of analysis_vanguard.analyze_experiment on web footprint files
+    larger than memory. The events are partitioned to disk by visit, each partition is sessionized
+    and reduced to sums on its own, and the sums are combined into the same report as the in-memory path.
+    Memory is bounded by one partition per process and the per-client sums.
+
+    Parameters:
+    file_paths (list of str): The paths of the web footprint files.
+    df_final_demo (pd.DataFrame): The client profiles.
+    df_final_experiment_clients (pd.DataFrame): The experiment roster with client_id and Variation columns.
+    partition_dir (str): The directory of the partition files.
+    n_partitions (int): The number of partitions (default is 64).
+    alpha (float): The significance level (default is 0.05).
+    threshold (float): The cost-effectiveness threshold (default is 5%).
+    max_workers (int): The number of processes reducing the partitions (default is 1, in this process).
+
+    Returns:
+    ExperimentReport: The results of every hypothesis.
+    """
+    roster = experiment_roster(df_final_demo, df_final_experiment_clients)
+    partition_paths, no_visit = partition_events(file_paths, roster, partition_dir, n_partitions)
+
+    # Combine the aggregates of the partitions one at a time, as they are reduced
+    # (the pool starts no process when they are reduced in this process)
+    totals, clients = None, None
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        if max_workers > 1:
+            aggregates = executor.map(partition_file_aggregates, partition_paths)
+        else:
+            aggregates = map(partition_file_aggregates, partition_paths)
+
+        for part_totals, part_clients in aggregates:
+            if totals is None:
+                totals, clients = part_totals, part_clients
+            else:
+                totals = totals.add(part_totals, fill_value=0)
+                clients = clients.add(part_clients, fill_value=0)
+
+    # Client ids are labels, as in the in-memory per-visit table
+    clients.index = clients.index.set_levels(clients.index.levels[1].astype(str), level='client_id')
+
+    return report_from_aggregates(totals, clients.sort_index(), alpha, threshold, no_visit)
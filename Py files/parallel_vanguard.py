@@ -0,0 +1,172 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import analysis_vanguard as an
+import outofcore_vanguard as oc
+import sessions_vanguard as sv
+
+
+# Shards per worker process, so that uneven shards still keep every process busy
+SHARDS_PER_WORKER = 4
+
+
+def event_codes(variation_df):
+    """
+    This function encodes the columns the per-visit computations need as integer arrays.
+
+    Parameters:
+    variation_df (pd.DataFrame): The events, with visit_id, client_id, Variation, date_time and process_step columns.
+
+    Returns:
+    tuple: The arrays ('visit', 'client', 'variation', 'date_time', 'step') of the events with a visit,
+    in visit and time order when the DataFrame carries that order, and the labels of the codes
+    ('visit_ids', 'client_ids', 'variations').
+    """
+    # Rows without a visit are clients with no web footprint, they hold no events
+    has_visit = variation_df['visit_id'].notna()
+    if not has_visit.all():
+        variation_df = variation_df[has_visit]
+
+    visit_codes, visit_ids = pd.factorize(variation_df['visit_id'])
+    client_codes, client_ids = pd.factorize(variation_df['client_id'])
+    variation_codes, variations = pd.factorize(variation_df['Variation'], sort=True)
+
+    arrays = {
+        'visit': visit_codes.astype(np.int32),
+        'client': client_codes.astype(np.int32),
+        'variation': variation_codes.astype(np.int8),
+        'date_time': pd.to_datetime(variation_df['date_time']).to_numpy(dtype='datetime64[ns]').view(np.int64),
+        'step': sv.step_codes(variation_df['process_step']),
+    }
+    labels = {
+        'visit_ids': np.asarray(visit_ids.astype(str)),
+        'client_ids': np.asarray(client_ids.astype(str)),
+        'variations': list(variations.astype(str)),
+    }
+
+    return arrays, labels
+
+def shard_bounds(visit_codes, visit_ids, n_shards):
+    """
+    This function assigns every visit to a shard by a hash of its visit_id and orders the events by shard.
+
+    Parameters:
+    visit_codes (np.ndarray): The visit code of every event.
+    visit_ids (np.ndarray): The visit_id of every visit code.
+    n_shards (int): The number of shards.
+
+    Returns:
+    tuple: The event order that groups the shards (stable, so each visit keeps its event order)
+    and the n_shards + 1 bounds of the shards in that order.
+    """
+    visit_shards = pd.util.hash_array(visit_ids.astype(object)) % np.uint64(n_shards)
+    shards = visit_shards[visit_codes]
+    order = np.argsort(shards, kind='stable')
+    bounds = np.searchsorted(shards[order], np.arange(n_shards + 1))
+
+    return order, bounds
+
+def share_arrays(arrays, order):
+    """
+    This function copies the arrays, in shard order, into one shared memory block.
+
+    Parameters:
+    arrays (dict): The arrays, from event_codes.
+    order (np.ndarray): The event order, from shard_bounds.
+
+    Returns:
+    tuple: The shared memory block and its layout, a list of (name, dtype, offset) of each array.
+    """
+    size = sum(array.nbytes for array in arrays.values())
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+    layout, offset = [], 0
+    for name, array in arrays.items():
+        view = np.ndarray(len(array), dtype=array.dtype, buffer=shm.buf, offset=offset)
+        np.take(array, order, out=view)
+        layout.append((name, array.dtype.str, offset))
+        offset += array.nbytes
+
+    return shm, layout
+
+def _shard_aggregates(shm_name, layout, n_events, start, stop, variations, is_ordered):
+    """
+    This function sessionizes one shard in a worker process, from the arrays of a shared memory block,
+    and reduces it to the aggregates of outofcore_vanguard.partition_aggregates, with client codes.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        arrays = {name: np.ndarray(n_events, dtype=dtype, buffer=shm.buf, offset=offset)[start:stop].copy()
+                  for name, dtype, offset in layout}
+    finally:
+        shm.close()
+
+    events = pd.DataFrame({
+        'visit_id': arrays['visit'],
+        'client_id': arrays['client'],
+        'Variation': pd.Categorical.from_codes(arrays['variation'], categories=variations),
+        'date_time': arrays['date_time'].view('datetime64[ns]'),
+        'process_step': pd.Categorical.from_codes(arrays['step'], categories=sv.STEP_ORDER, ordered=True),
+    })
+    if is_ordered:
+        events.attrs['sort_order'] = sv.VISIT_ORDER
+
+    return oc.partition_aggregates(events)
+
+def analyze_parallel(variation_df, n_shards=None, max_workers=None, alpha=an.ALPHA, threshold=5.0):
+    """
+    This function runs the analyses of analysis_vanguard.analyze_experiment with the per-visit
+    computations (dwell times, backtracks, session durations) spread over a process pool. The events
+    are split into shards by a hash of their visit_id, so every visit lies whole in one shard; the
+    integer-coded events are shared with the workers through a shared memory block, each shard is
+    sessionized and reduced to per-group and per-client sums, and the sums of the shards are added up.
+
+    Parameters:
+    variation_df (pd.DataFrame): The merged event DataFrame.
+    n_shards (int): The number of shards (default is SHARDS_PER_WORKER per process).
+    max_workers (int): The number of processes (default is the number of CPUs).
+    alpha (float): The significance level (default is 0.05).
+    threshold (float): The cost-effectiveness threshold (default is 5%).
+
+    Returns:
+    ExperimentReport: The results of every hypothesis.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    n_shards = n_shards or max_workers * SHARDS_PER_WORKER
+
+    arrays, labels = event_codes(variation_df)
+    order, bounds = shard_bounds(arrays['visit'], labels['visit_ids'], n_shards)
+    is_ordered = sv.is_visit_ordered(variation_df)
+    n_events = len(order)
+
+    shm, layout = share_arrays(arrays, order)
+    del arrays
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_shard_aggregates, shm.name, layout, n_events, bounds[number],
+                                       bounds[number + 1], labels['variations'], is_ordered)
+                       for number in range(n_shards) if bounds[number + 1] > bounds[number]]
+            aggregates = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # Add up the sums of the shards
+    totals = pd.concat([part_totals for part_totals, _ in aggregates]).groupby(level=0).sum()
+    clients = pd.concat([part_clients for _, part_clients in aggregates]).groupby(level=[0, 1], observed=True).sum()
+
+    # Decode the client codes
+    client_ids = labels['client_ids'][clients.index.get_level_values('client_id').to_numpy()]
+    clients.index = pd.MultiIndex.from_arrays([clients.index.get_level_values('Variation').astype(str), client_ids],
+                                              names=['Variation', 'client_id'])
+
+    # Rows without a visit of each client, with the labels of the decoded sums
+    no_visit = an.no_visit_rows(variation_df)
+    no_visit.index = pd.MultiIndex.from_arrays([no_visit.index.get_level_values(level).astype(str)
+                                                for level in no_visit.index.names], names=no_visit.index.names)
+
+    return oc.report_from_aggregates(totals, clients.sort_index(), alpha, threshold, no_visit)
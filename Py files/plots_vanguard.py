@@ -0,0 +1,175 @@
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+import sessions_vanguard as sv
+
+
+def _axes(ax, figsize):
+    """
+    This function returns the figure and axes to draw on, creating them when no axes are given.
+    """
+    if ax is None:
+        return plt.subplots(figsize=figsize)
+    return ax.figure, ax
+
+def plot_time_spent(result, ax=None):
+    """
+    This function plots the average time spent on each step.
+
+    Parameters:
+    result (TimeSpentResult): The result of analysis_vanguard.time_spent.
+    ax (matplotlib.axes.Axes): The axes to draw on (default is a new figure).
+
+    Returns:
+    matplotlib.figure.Figure: The figure.
+    """
+    fig, ax = _axes(ax, (10, 6))
+    sns.barplot(x='process_step', y='time_spent', data=result.time_spent_summary, order=sv.STEP_ORDER, ax=ax)
+    ax.set_title('Average Time Spent on Each Step')
+    ax.set_xlabel('Process Step')
+    ax.set_ylabel('Average Time Spent (seconds)')
+    ax.tick_params(axis='x', labelrotation=45)
+    return fig
+
+def plot_completion_rates(result, ax=None):
+    """
+    This function plots the completion rate of each group.
+
+    Parameters:
+    result (CompletionResult): The result of analysis_vanguard.completion_rates.
+    ax (matplotlib.axes.Axes): The axes to draw on (default is a new figure).
+
+    Returns:
+    matplotlib.figure.Figure: The figure.
+    """
+    fig, ax = _axes(ax, (5, 3))
+    sns.barplot(x='Variation', y='completion_rate', hue='Variation', data=result.completion_data, palette='Set1', ax=ax)
+    ax.set_title('Completion Rate by Variation')
+    ax.set_xlabel('Variation')
+    ax.set_ylabel('Completion Rate (%)')
+    ax.set_ylim(0, 100)
+    return fig
+
+def plot_cost_effectiveness(result, ax=None):
+    """
+    This function plots the mean completion rate of the Test clients against the threshold.
+
+    Parameters:
+    result (CostEffectivenessResult): The result of analysis_vanguard.cost_effectiveness.
+    ax (matplotlib.axes.Axes): The axes to draw on (default is a new figure).
+
+    Returns:
+    matplotlib.figure.Figure: The figure.
+    """
+    fig, ax = _axes(ax, (6, 4))
+    values = [result.mean_completion_rate, result.threshold]
+    ax.bar(['Completion Rate', 'Threshold'], values, color=['skyblue', 'lightcoral'])
+    ax.axhline(y=result.threshold, color='r', linestyle='--', label=f'{result.threshold:g}% Threshold')
+    for index, value in enumerate(values):
+        ax.text(index, value + 1, f"{value:.2f}", ha='center')
+    ax.set_title(f'Completion Rate vs. {result.threshold:g}% Threshold')
+    ax.set_ylabel('Percentage')
+    ax.legend()
+    return fig
+
+def plot_completion_lift(result, ax=None):
+    """
+    This function plots the visit- and client-level lift in completion rate, with its confidence interval,
+    against the threshold.
+
+    Parameters:
+    result (CompletionLiftResult): The result of analysis_vanguard.completion_lift.
+    ax (matplotlib.axes.Axes): The axes to draw on (default is a new figure).
+
+    Returns:
+    matplotlib.figure.Figure: The figure.
+    """
+    fig, ax = _axes(ax, (6, 4))
+    lift = result.lift
+    errors = [lift['lift'] - lift['ci_low'], lift['ci_high'] - lift['lift']]
+    ax.bar(lift.index.str.capitalize(), lift['lift'], yerr=errors, capsize=6, color=['skyblue', 'lightgreen'])
+    ax.axhline(y=result.threshold, color='r', linestyle='--', label=f'{result.threshold:g} pp Threshold')
+    ax.axhline(y=0, color='black', linewidth=0.8)
+    ax.set_title('Completion Rate Lift (Test - Control)')
+    ax.set_ylabel('Lift (percentage points)')
+    ax.legend()
+    return fig
+
+def plot_session_durations_by_step(result, ax=None):
+    """
+    This function plots the average time spent on each step by group.
+
+    Parameters:
+    result (StepDurationResult): The result of analysis_vanguard.session_durations_by_step.
+    ax (matplotlib.axes.Axes): The axes to draw on (default is a new figure).
+
+    Returns:
+    matplotlib.figure.Figure: The figure.
+    """
+    fig, ax = _axes(ax, (12, 6))
+    palette = {'Control': 'skyblue', 'Test': 'red'}
+    sns.barplot(x='process_step', y='time_spent', hue='Variation', data=result.step_summary,
+                order=sv.STEP_ORDER, palette=palette, ax=ax)
+    ax.set_title('Average Duration Spent on Each Step by Group (in seconds)')
+    ax.set_xlabel('Process Step')
+    ax.set_ylabel('Average Duration (seconds)')
+    return fig
+
+def plot_error_rates(result, ax=None):
+    """
+    This function plots the error rate of each group.
+
+    Parameters:
+    result (ErrorRateResult): The result of analysis_vanguard.error_rates.
+    ax (matplotlib.axes.Axes): The axes to draw on (default is a new figure).
+
+    Returns:
+    matplotlib.figure.Figure: The figure.
+    """
+    fig, ax = _axes(ax, (10, 6))
+    palette = {'Control': 'skyblue', 'Test': 'red'}
+    sns.barplot(x='Variation', y='Error Rate', hue='Variation', data=result.error_rates, palette=palette, ax=ax)
+    ax.set_title('Error Rates for Control and Test Groups')
+    ax.set_xlabel('Group')
+    ax.set_ylabel('Error Rate')
+    return fig
+
+def plot_transition_matrix(result, variation, ax=None):
+    """
+    This function plots the step-transition rates of a group as a heatmap.
+
+    Parameters:
+    result (FunnelResult): The result of funnel_vanguard.funnel.
+    variation (str): The group, 'Control' or 'Test'.
+    ax (matplotlib.axes.Axes): The axes to draw on (default is a new figure).
+
+    Returns:
+    matplotlib.figure.Figure: The figure.
+    """
+    fig, ax = _axes(ax, (7, 5))
+    transitions = result.transitions[result.transitions['Variation'] == variation]
+    rates = transitions.pivot(index='from_step', columns='to_step', values='rate').loc[sv.STEP_ORDER, sv.STEP_ORDER]
+    sns.heatmap(rates, annot=True, fmt='.2f', cmap='Blues', vmin=0, vmax=1, ax=ax)
+    ax.set_title(f'Step Transition Rates ({variation} Group)')
+    ax.set_xlabel('Next Step')
+    ax.set_ylabel('Step')
+    return fig
+
+def plot_report(report):
+    """
+    This function plots every result of an experiment report.
+
+    Parameters:
+    report (ExperimentReport): The result of analysis_vanguard.analyze_experiment.
+
+    Returns:
+    dict: The figure of each result, keyed by the name of the report field.
+    """
+    return {
+        'time_spent': plot_time_spent(report.time_spent),
+        'completion': plot_completion_rates(report.completion),
+        'cost_effectiveness': plot_cost_effectiveness(report.cost_effectiveness),
+        'completion_lift': plot_completion_lift(report.completion_lift),
+        'durations_by_step': plot_session_durations_by_step(report.durations_by_step),
+        'error_rates': plot_error_rates(report.error_rates),
+    }
@@ -0,0 +1,198 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from lazy_vanguard import lazy_import
+
+# Statistics packages are imported on first use
+stats = lazy_import('scipy.stats')
+multitest = lazy_import('statsmodels.stats.multitest')
+
+
+# Demographic columns of the visit table that segments are cut on by default
+SEGMENT_COLUMNS = ['client_status', 'age_group', 'gendr']
+
+# Sums kept per segment and group; every test statistic is computed from them
+TOTAL_COLUMNS = ['sessions', 'confirms', 'duration_sum', 'duration_sq_sum', 'n_events', 'backtracks']
+
+# Tests of each segment and the columns of their p-values
+TEST_P_VALUES = {'completion': 'z_p_value', 'duration': 't_p_value', 'error_rate': 'chi2_p_value'}
+
+
+def segment_totals(visits, columns):
+    """
+    This function sums the per-visit measures of each segment and group in a single groupby.
+
+    Parameters:
+    visits (pd.DataFrame): One row per visit with the Variation, duration, reached_confirm, n_events and
+    backtracks columns and the segment columns, e.g. from store_vanguard.visit_table.
+    columns (list of str): The columns that define the segments.
+
+    Returns:
+    pd.DataFrame: The TOTAL_COLUMNS of each combination of segment values and Variation.
+    """
+    duration = visits['duration'].to_numpy(dtype=float)
+    measures = pd.DataFrame({
+        'sessions': 1,
+        'confirms': visits['reached_confirm'].to_numpy(dtype=np.int64),
+        'duration_sum': duration,
+        'duration_sq_sum': duration ** 2,
+        'n_events': visits['n_events'].to_numpy(dtype=np.int64),
+        'backtracks': visits['backtracks'].to_numpy(dtype=np.int64),
+    }, index=visits.index)
+    keys = [visits[column].astype(str) for column in columns] + [visits['Variation'].astype(str)]
+
+    return measures.groupby(keys, observed=True).sum().reset_index()
+
+def completion_ztests(x_control, n_control, x_test, n_test):
+    """
+    This function performs the two-sided pooled z-test of statsmodels' proportions_ztest on arrays of segments.
+
+    Parameters:
+    x_control, n_control, x_test, n_test (np.ndarray): The confirm and total sessions of each group.
+
+    Returns:
+    tuple: The z-statistics and p-values.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p_control, p_test = x_control / n_control, x_test / n_test
+        pooled = (x_control + x_test) / (n_control + n_test)
+        z_stat = (p_control - p_test) / np.sqrt(pooled * (1 - pooled) * (1 / n_control + 1 / n_test))
+
+    return z_stat, 2 * stats.norm.sf(np.abs(z_stat))
+
+def duration_ttests(n_control, sum_control, sq_control, n_test, sum_test, sq_test):
+    """
+    This function performs the pooled-variance t-test of analyze_session_durations (Test sessions
+    longer than Control sessions) on arrays of segments, from the sums and sums of squares.
+
+    Parameters:
+    n_control, sum_control, sq_control, n_test, sum_test, sq_test (np.ndarray): The number of sessions
+    and the sums and sums of squares of their durations, for each group.
+
+    Returns:
+    tuple: The t-statistics and one-sided p-values.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_control, mean_test = sum_control / n_control, sum_test / n_test
+        ss_control = np.maximum(sq_control - sum_control * mean_control, 0)
+        ss_test = np.maximum(sq_test - sum_test * mean_test, 0)
+        dof = n_control + n_test - 2
+        pooled_var = (ss_control + ss_test) / dof
+        t_stat = (mean_test - mean_control) / np.sqrt(pooled_var * (1 / n_control + 1 / n_test))
+
+    return t_stat, stats.t.sf(t_stat, dof)
+
+def error_rate_chi2_tests(events_control, back_control, events_test, back_test):
+    """
+    This function performs the chi-square test of scipy's chi2_contingency, with Yates' continuity
+    correction, on the 2x2 backtrack contingency tables of arrays of segments.
+
+    Parameters:
+    events_control, back_control, events_test, back_test (np.ndarray): The events and backtracks of each group.
+
+    Returns:
+    tuple: The chi-square statistics and p-values.
+    """
+    # Observed tables of shape (segments, 2 groups, 2 outcomes)
+    observed = np.stack([
+        np.stack([events_control - back_control, back_control], axis=-1),
+        np.stack([events_test - back_test, back_test], axis=-1),
+    ], axis=1).astype(float)
+    total = observed.sum(axis=(1, 2), keepdims=True)
+    expected = observed.sum(axis=2, keepdims=True) * observed.sum(axis=1, keepdims=True) / total
+
+    # Yates' correction moves each observed count up to 0.5 towards its expected count
+    diff = expected - observed
+    corrected = observed + np.sign(diff) * np.minimum(0.5, np.abs(diff))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        chi2 = ((corrected - expected) ** 2 / expected).sum(axis=(1, 2))
+
+    return chi2, stats.chi2.sf(chi2, 1)
+
+def adjust_p_values(p_values, method='fdr_bh', alpha=0.05):
+    """
+    This function corrects p-values for multiple comparisons, ignoring missing p-values.
+
+    Parameters:
+    p_values (np.ndarray): The p-values.
+    method (str): A method of statsmodels' multipletests, e.g. 'fdr_bh', 'holm' or 'bonferroni' (default is 'fdr_bh').
+    alpha (float): The family-wise error rate or false discovery rate (default is 0.05).
+
+    Returns:
+    tuple: The adjusted p-values and the boolean rejection flags (NaN and False where the p-value is missing).
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = np.full(len(p_values), np.nan)
+    reject = np.zeros(len(p_values), dtype=bool)
+
+    tested = ~np.isnan(p_values)
+    if tested.any():
+        reject[tested], adjusted[tested], _, _ = multitest.multipletests(p_values[tested], alpha=alpha, method=method)
+
+    return adjusted, reject
+
+def segment_tests(visits, columns=SEGMENT_COLUMNS, max_depth=None, method='fdr_bh', alpha=0.05):
+    """
+    This function runs the completion z-test, the duration t-test and the backtrack chi-square test
+    for every segment of every combination of the given columns at once. The visits are summed in a
+    single groupby at the finest level, coarser cuts are summed from those totals, and the tests are
+    evaluated as array operations over all segments. The p-values of each test are then corrected
+    for the number of segments tested.
+
+    Parameters:
+    visits (pd.DataFrame): One row per visit, e.g. from store_vanguard.visit_table.
+    columns (list of str): The categorical columns to cut on; bin continuous ones first, e.g. with pd.cut.
+    max_depth (int): The largest number of columns combined in a cut (default is all of them).
+    method (str): The multiple-comparison correction, see adjust_p_values (default is 'fdr_bh').
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    pd.DataFrame: One row per segment with its cut, its values, the group sizes and rates,
+    the test statistics, and the raw and adjusted p-values of each test.
+    """
+    columns = list(columns)
+    finest = segment_totals(visits, columns)
+
+    # Sum the finest segments up to every cut
+    cuts = []
+    for depth in range(1, (max_depth or len(columns)) + 1):
+        for cut in combinations(columns, depth):
+            totals = finest.groupby(list(cut) + ['Variation'])[TOTAL_COLUMNS].sum()
+            wide = totals.unstack('Variation').reindex(
+                columns=pd.MultiIndex.from_product([TOTAL_COLUMNS, ['Control', 'Test']]))
+            wide.columns = [f'{measure}_{variation.lower()}' for measure, variation in wide.columns]
+            wide = wide.reset_index()
+            wide.insert(0, 'segment', wide[list(cut)].astype(str).apply(
+                lambda values: ', '.join(f'{column}={value}' for column, value in zip(cut, values)), axis=1))
+            wide.insert(0, 'cut', ' x '.join(cut))
+            cuts.append(wide)
+    results = pd.concat(cuts, ignore_index=True)
+    results = results[['cut', 'segment'] + columns + [name for name in results.columns
+                                                      if name not in ['cut', 'segment'] + columns]]
+
+    # Evaluate every test on all segments at once
+    get = lambda name: results[name].to_numpy(dtype=float)
+    results['completion_rate_control'] = get('confirms_control') / get('sessions_control') * 100
+    results['completion_rate_test'] = get('confirms_test') / get('sessions_test') * 100
+    results['z_stat'], results['z_p_value'] = completion_ztests(
+        get('confirms_control'), get('sessions_control'), get('confirms_test'), get('sessions_test'))
+    results['mean_duration_control'] = get('duration_sum_control') / get('sessions_control')
+    results['mean_duration_test'] = get('duration_sum_test') / get('sessions_test')
+    results['t_stat'], results['t_p_value'] = duration_ttests(
+        get('sessions_control'), get('duration_sum_control'), get('duration_sq_sum_control'),
+        get('sessions_test'), get('duration_sum_test'), get('duration_sq_sum_test'))
+    results['error_rate_control'] = get('backtracks_control') / get('n_events_control')
+    results['error_rate_test'] = get('backtracks_test') / get('n_events_test')
+    results['chi2'], results['chi2_p_value'] = error_rate_chi2_tests(
+        get('n_events_control'), get('backtracks_control'), get('n_events_test'), get('backtracks_test'))
+
+    # Correct each test for the number of segments it was run on
+    for test, p_column in TEST_P_VALUES.items():
+        results[f'{p_column}_adjusted'], results[f'{test}_significant'] = adjust_p_values(
+            results[p_column], method, alpha)
+
+    # Keep the group sizes but not the other sums
+    return results.drop(columns=[f'{measure}_{variation}' for measure in TOTAL_COLUMNS[1:]
+                                 for variation in ('control', 'test')])
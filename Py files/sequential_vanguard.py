@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+import analysis_vanguard as an
+
+
+# Running counts of each group kept by the sequential test
+COUNT_COLUMNS = ['sessions', 'confirms']
+
+# Standard deviation of the normal prior mixed over the completion-rate difference, as a proportion:
+# the 5 percentage points of the cost-effectiveness threshold
+DEFAULT_TAU = 0.05
+
+# Sessions each group needs before the normal approximation is trusted and the test is evaluated
+MIN_SESSIONS = 100
+
+
+@dataclass
+class SequentialResult:
+    """
+    Current state of the always-valid test of the completion rates and the decision to stop or continue.
+    """
+    control_rate: float
+    test_rate: float
+    likelihood_ratio: float
+    p_value: float
+    n_looks: int
+    alpha: float = an.ALPHA
+
+    @property
+    def is_significant(self):
+        return self.p_value <= self.alpha
+
+    @property
+    def decision(self):
+        return 'stop' if self.is_significant else 'continue'
+
+def sequential_state(alpha=an.ALPHA, tau=DEFAULT_TAU, min_sessions=MIN_SESSIONS):
+    """
+    This function creates the state of a sequential test of the completion rates with no data yet.
+
+    Parameters:
+    alpha (float): The significance level, valid however often the test is looked at (default is 0.05).
+    tau (float): The standard deviation of the mixing prior on the completion-rate difference (default is 0.05).
+    min_sessions (int): The sessions each group needs before the test is evaluated (default is 100).
+
+    Returns:
+    dict: The settings, the running counts of each group, the always-valid p-value so far and the number of looks.
+    """
+    return {
+        'alpha': alpha,
+        'tau': tau,
+        'min_sessions': min_sessions,
+        'counts': {variation: dict.fromkeys(COUNT_COLUMNS, 0) for variation in ('Control', 'Test')},
+        'p_value': 1.0,
+        'likelihood_ratio': 1.0,
+        'n_looks': 0,
+    }
+
+def msprt_likelihood_ratio(estimate, variance, tau):
+    """
+    This function computes the mixture likelihood ratio of the mSPRT of a normally distributed
+    estimate against a zero effect, mixing the effect over a normal prior N(0, tau**2).
+
+    Parameters:
+    estimate (float): The estimated effect.
+    variance (float): The variance of the estimate.
+    tau (float): The standard deviation of the mixing prior.
+
+    Returns:
+    float: The mixture likelihood ratio.
+    """
+    tau_sq = tau ** 2
+    return np.sqrt(variance / (variance + tau_sq)) * np.exp(
+        tau_sq * estimate ** 2 / (2 * variance * (variance + tau_sq)))
+
+def update_sequential(state, control_sessions, control_confirms, test_sessions, test_confirms):
+    """
+    This function adds a batch of finished visits to the running counts and updates the always-valid
+    p-value, in constant time whatever the amount of data seen so far. The p-value never increases,
+    so the experiment can be stopped as soon as it falls below alpha without inflating false positives.
+
+    Parameters:
+    state (dict): The sequential state, from sequential_state.
+    control_sessions, control_confirms (int): The sessions and confirm sessions of the Control group in the batch.
+    test_sessions, test_confirms (int): The sessions and confirm sessions of the Test group in the batch.
+
+    Returns:
+    SequentialResult: The current test state and decision.
+    """
+    counts = state['counts']
+    counts['Control']['sessions'] += control_sessions
+    counts['Control']['confirms'] += control_confirms
+    counts['Test']['sessions'] += test_sessions
+    counts['Test']['confirms'] += test_confirms
+    state['n_looks'] += 1
+
+    n_control, n_test = counts['Control']['sessions'], counts['Test']['sessions']
+    control_rate = counts['Control']['confirms'] / n_control if n_control else np.nan
+    test_rate = counts['Test']['confirms'] / n_test if n_test else np.nan
+
+    # Update the test once both groups are large enough for the normal approximation
+    if min(n_control, n_test) >= state['min_sessions']:
+        variance = control_rate * (1 - control_rate) / n_control + test_rate * (1 - test_rate) / n_test
+        if variance > 0:
+            state['likelihood_ratio'] = float(msprt_likelihood_ratio(test_rate - control_rate, variance, state['tau']))
+            state['p_value'] = min(state['p_value'], 1 / state['likelihood_ratio'])
+
+    return SequentialResult(control_rate * 100, test_rate * 100, state['likelihood_ratio'],
+                            state['p_value'], state['n_looks'], state['alpha'])
+
+def update_from_stats(state, stats):
+    """
+    This function brings the sequential test up to date with the sufficient statistics of
+    incremental_vanguard, adding the visits closed since the previous update as one batch.
+
+    Parameters:
+    state (dict): The sequential state.
+    stats (pd.DataFrame): The cumulative sufficient statistics, indexed by Variation.
+
+    Returns:
+    SequentialResult: The current test state and decision.
+    """
+    counts = state['counts']
+    total = lambda variation, column: int(stats.loc[variation, column]) if variation in stats.index else 0
+
+    return update_sequential(
+        state,
+        total('Control', 'sessions') - counts['Control']['sessions'],
+        total('Control', 'confirms') - counts['Control']['confirms'],
+        total('Test', 'sessions') - counts['Test']['sessions'],
+        total('Test', 'confirms') - counts['Test']['confirms'],
+    )
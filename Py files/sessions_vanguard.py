@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+import kernels_vanguard as vk
+
+
+# Ordered steps of the online process
+STEP_ORDER = ['start', 'step_1', 'step_2', 'step_3', 'confirm']
+
+# Row order in which every visit's events are contiguous and in time order
+VISIT_ORDER = ['visit_id', 'date_time']
+
+
+def step_codes(process_step):
+    """
+    This function encodes the process steps as integer codes in process order
+    (0 for 'start' up to 4 for 'confirm', -1 for unknown or missing steps).
+
+    Parameters:
+    process_step (pd.Series): The process steps, as strings or as the ordered step categorical.
+
+    Returns:
+    np.ndarray: The int8 step codes.
+    """
+    # The step categorical already holds the codes
+    if isinstance(process_step.dtype, pd.CategoricalDtype) and list(process_step.cat.categories) == STEP_ORDER:
+        return process_step.cat.codes.to_numpy(dtype=np.int8)
+
+    # Encode plain strings against the process order
+    return pd.Categorical(process_step, categories=STEP_ORDER, ordered=True).codes.astype(np.int8)
+
+def visit_arrays(variation_df):
+    """
+    This function extracts the contiguous arrays kernels_vanguard.visit_kernel works on.
+
+    Parameters:
+    variation_df (pd.DataFrame): The DataFrame containing the visit ids, timestamps and process steps.
+
+    Returns:
+    tuple: The visit codes (-1 where visit_id is missing), the int64 timestamps in nanoseconds and the int8 step codes.
+    """
+    visit_codes = pd.factorize(variation_df['visit_id'])[0]
+    times = pd.to_datetime(variation_df['date_time']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    return visit_codes, times, step_codes(variation_df['process_step'])
+
+def is_visit_ordered(df):
+    """
+    This function checks whether the events of every visit are known to be contiguous
+    and in time order, so that a sort by visit and time can be skipped.
+    pandas carries df.attrs through most operations, so code that reorders the rows
+    (e.g. df.sample) must clear df.attrs['sort_order'] itself.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to be checked.
+
+    Returns:
+    bool: True if the DataFrame carries the visit order flag.
+    """
+    return df.attrs.get('sort_order') == VISIT_ORDER
+
+def sessionize(variation_df):
+    """
+    This function walks the events once, in visit and time order, and emits one row per visit:
+    start and end time, duration, number of events, first, last and highest step, steps reached,
+    whether the visit reached the 'confirm' step, the number of backtracks and the dwell time
+    spent on each step.
+
+    Dwell time follows analyze_time_spent: each event is credited with the seconds elapsed
+    since the previous event of the same visit, and the first event of a visit with zero.
+    Per step the table keeps the dwell sum ('dwell_<step>'), the sum of squares ('dwell_sq_<step>')
+    and the number of events ('events_<step>'), which is enough to rebuild event-level means,
+    variances and t-tests without going back to the events.
+
+    Parameters:
+    variation_df (pd.DataFrame): The merged DataFrame with visit_id, process_step, date_time,
+    client_id and Variation columns.
+
+    Returns:
+    pd.DataFrame: The per-visit DataFrame.
+    """
+    # Rows without a visit are clients with no web footprint, they hold no events
+    has_visit = variation_df['visit_id'].notna()
+    if not has_visit.all():
+        variation_df = variation_df[has_visit]
+
+    # Sort by visit_id and date_time, unless the rows already are in that order
+    if not is_visit_ordered(variation_df):
+        variation_df = variation_df.sort_values(by=VISIT_ORDER)
+
+    # Dwell time, previous step and backtrack flag of every event in one pass
+    visit_codes, times, steps = visit_arrays(variation_df)
+    is_first, dwell, prev_steps, is_back_track = vk.visit_kernel(visit_codes, times, steps)
+    n_steps = len(STEP_ORDER)
+
+    # Position of the first and last event and the index of the visit of each event
+    # (no visit at all when there are no events)
+    starts = np.flatnonzero(is_first)
+    ends = np.append(starts[1:], len(visit_codes))[:len(starts)] - 1
+    visit_index = np.cumsum(is_first) - 1
+
+    # Per-visit reductions
+    known = steps >= 0
+    step_bits = np.where(known, np.left_shift(1, steps.clip(0)), 0).astype(np.int8)
+    steps_reached = np.bitwise_or.reduceat(step_bits, starts)
+
+    # Keep the dtypes (categoricals included) of the per-visit labels
+    first_rows = variation_df[['visit_id', 'client_id', 'Variation']].iloc[starts].reset_index(drop=True)
+
+    sessions = first_rows.assign(
+        start_time=times[starts].view('datetime64[ns]'),
+        end_time=times[ends].view('datetime64[ns]'),
+        duration=(times[ends] - times[starts]) / 1e9,
+        n_events=(ends - starts + 1).astype(np.int32),
+        steps_reached=steps_reached,
+        first_step=steps[starts],
+        last_step=steps[ends],
+        max_step=np.maximum.reduceat(steps, starts),
+        reached_confirm=(steps_reached & (1 << (n_steps - 1))) != 0,
+        backtracks=np.add.reduceat(is_back_track.astype(np.int32), starts),
+    )
+
+    # Per-visit, per-step dwell sums, sums of squares and event counts in one bincount each
+    cell = visit_index[known] * n_steps + steps[known]
+    size = len(starts) * n_steps
+    dwell_sums = np.bincount(cell, weights=dwell[known], minlength=size).reshape(-1, n_steps)
+    dwell_squares = np.bincount(cell, weights=dwell[known] ** 2, minlength=size).reshape(-1, n_steps)
+    step_events = np.bincount(cell, minlength=size).reshape(-1, n_steps).astype(np.int32)
+
+    for code, step in enumerate(STEP_ORDER):
+        sessions[f'dwell_{step}'] = dwell_sums[:, code]
+        sessions[f'dwell_sq_{step}'] = dwell_squares[:, code]
+        sessions[f'events_{step}'] = step_events[:, code]
+
+    return sessions
+
+def summarize_step_dwell(sessions, by=None):
+    """
+    This function rebuilds the event-level time spent statistics of each process step from the
+    per-visit table built by sessionize, without going back to the events.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame.
+    by (str): The column to group the visits by, e.g. 'Variation' (default is all visits together).
+
+    Returns:
+    pd.DataFrame: One row per group and process step with the 'count', mean ('time_spent') and 'std' of the time spent.
+    """
+    # Sum the per-visit dwell sums, sums of squares and event counts
+    columns = [f'{prefix}{step}' for prefix in ('events_', 'dwell_', 'dwell_sq_') for step in STEP_ORDER]
+    if by is None:
+        totals = sessions[columns].sum().to_frame().T
+    else:
+        totals = sessions.groupby(by, observed=True)[columns].sum()
+    totals = totals.to_numpy(dtype=float).reshape(len(totals), 3, len(STEP_ORDER))
+    counts, sums, squares = totals[:, 0], totals[:, 1], totals[:, 2]
+
+    # Mean and sample standard deviation of the time spent on each step
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        stds = np.sqrt(np.maximum(squares - sums * means, 0) / (counts - 1))
+
+    summary = pd.DataFrame({
+        'process_step': np.tile(STEP_ORDER, len(counts)),
+        'count': counts.ravel().astype(np.int64),
+        'time_spent': means.ravel(),
+        'std': stds.ravel(),
+    })
+    if by is not None:
+        summary.insert(0, by, np.repeat(sessions.groupby(by, observed=True).size().index, len(STEP_ORDER)))
+
+    # Drop the steps no event reached
+    return summary[summary['count'] > 0].reset_index(drop=True)
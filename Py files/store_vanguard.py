@@ -0,0 +1,275 @@
+import glob
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import cache_vanguard as cv
+import sessions_vanguard as sv
+
+
+# Prefix of the indexed visit stores in the cache directory
+STORE_PREFIX = "store_"
+
+# Client attributes copied onto every visit, from analyze_client_demographics and the client profiles
+DEMOGRAPHIC_COLUMNS = ['client_status', 'age_group', 'gendr', 'total_tenure_months', 'bal']
+
+# Dimensions the dashboard filters on: categorical ones take a list of values, ranged ones a (low, high) pair
+CATEGORY_FILTERS = ['client_status', 'age_group', 'gendr']
+RANGE_FILTERS = ['total_tenure_months', 'bal', 'start_time']
+
+# Per-visit measures summed by the store queries
+STEP_COLUMNS = [f'{prefix}{step}' for prefix in ('events_', 'dwell_', 'dwell_sq_') for step in sv.STEP_ORDER]
+
+
+def visit_table(sessions, variation_df, no_visit=None):
+    """
+    This function attaches the client attributes of DEMOGRAPHIC_COLUMNS to every visit. The rows without
+    a visit are kept as one row per client with no start time, no duration and no events, so that the
+    filtered error rates count them as analyze_error_rates does.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+    variation_df (pd.DataFrame): The merged experiment DataFrame with the client attributes.
+    no_visit (pd.Series): The rows without a visit of each client, from analysis_vanguard.no_visit_rows
+    (default is none).
+
+    Returns:
+    pd.DataFrame: One row per visit with its measures, its client attributes and its start time
+    in seconds since the epoch, followed by one row per client with rows without a visit.
+    """
+    clients = variation_df[['client_id'] + DEMOGRAPHIC_COLUMNS].drop_duplicates('client_id')
+    clients = clients.assign(client_id=clients['client_id'].astype(str))
+
+    visits = pd.DataFrame({
+        'Variation': sessions['Variation'].astype(str),
+        'client_id': sessions['client_id'].astype(str),
+        'start_time': sessions['start_time'].to_numpy(dtype='datetime64[s]').astype(np.int64),
+        'duration': sessions['duration'],
+        'reached_confirm': sessions['reached_confirm'].astype(int),
+        'n_events': sessions['n_events'],
+        'backtracks': sessions['backtracks'],
+        'no_visit_rows': 0,
+    })
+    for column in STEP_COLUMNS:
+        visits[column] = sessions[column].to_numpy()
+
+    # One row per client for the rows without a visit, with a null start time and duration
+    if no_visit is not None and len(no_visit):
+        no_visits = pd.DataFrame({
+            'Variation': no_visit.index.get_level_values('Variation').astype(str),
+            'client_id': no_visit.index.get_level_values('client_id').astype(str),
+            'start_time': pd.array([pd.NA] * len(no_visit), dtype='Int64'),
+            'duration': np.nan,
+            'reached_confirm': 0,
+            'n_events': 0,
+            'backtracks': 0,
+            'no_visit_rows': no_visit.to_numpy(),
+        })
+        for column in STEP_COLUMNS:
+            no_visits[column] = 0
+        visits = pd.concat([visits, no_visits], ignore_index=True)
+
+    return visits.merge(clients, on='client_id', how='left')
+
+def store_path_for(key, cache_dir=cv.CACHE_DIR):
+    """
+    This function returns the path of the visit store for a content hash of the source files.
+
+    Parameters:
+    key (str): The content hash of the source files.
+    cache_dir (str): The directory of the columnar cache.
+
+    Returns:
+    str: The path of the SQLite file.
+    """
+    return os.path.join(cache_dir, f"{STORE_PREFIX}{key}.sqlite")
+
+def write_store(visits, file_paths, cache_dir=cv.CACHE_DIR, key=None):
+    """
+    This function writes the visits to a SQLite file with an index on every filter dimension,
+    so that filtered queries only read the matching visits.
+
+    Parameters:
+    visits (pd.DataFrame): The visits, from visit_table.
+    file_paths (list of str): The paths of the source files the visits were built from.
+    cache_dir (str): The directory of the columnar cache.
+    key (str): The content hash of the source files, from cache_vanguard.hash_source_files (default is to compute it).
+
+    Returns:
+    str: The path of the written SQLite file.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    store_path = store_path_for(key or cv.hash_source_files(file_paths), cache_dir)
+
+    # Write to a temporary file first so readers never see a half-written store
+    tmp_path = store_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    con = sqlite3.connect(tmp_path)
+    try:
+        visits.to_sql('visits', con, index=False, chunksize=100_000)
+        for column in CATEGORY_FILTERS + RANGE_FILTERS:
+            con.execute(f"CREATE INDEX idx_visits_{column} ON visits ({column})")
+        con.execute("ANALYZE")
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp_path, store_path)
+
+    return store_path
+
+def latest_store_path(cache_dir=cv.CACHE_DIR):
+    """
+    This function finds the most recently written visit store.
+
+    Parameters:
+    cache_dir (str): The directory of the columnar cache.
+
+    Returns:
+    str or None: The path of the SQLite file, or None if there is none.
+    """
+    store_paths = glob.glob(os.path.join(cache_dir, f"{STORE_PREFIX}*.sqlite"))
+    if not store_paths:
+        return None
+
+    return max(store_paths, key=os.path.getmtime)
+
+def connect(store_path):
+    """
+    This function opens a visit store read-only.
+    """
+    return sqlite3.connect(f"file:{store_path}?mode=ro", uri=True, check_same_thread=False)
+
+def filter_options(store_path):
+    """
+    This function lists the values of the categorical filters and the bounds of the ranged filters.
+
+    Parameters:
+    store_path (str): The path of the SQLite file.
+
+    Returns:
+    dict: A sorted list of values for each categorical filter and a (low, high) pair for each ranged filter.
+    """
+    con = connect(store_path)
+    try:
+        options = {}
+        for column in CATEGORY_FILTERS:
+            rows = con.execute(f"SELECT DISTINCT {column} FROM visits WHERE {column} IS NOT NULL ORDER BY {column}")
+            options[column] = [row[0] for row in rows]
+        for column in RANGE_FILTERS:
+            options[column] = con.execute(f"SELECT MIN({column}), MAX({column}) FROM visits").fetchone()
+    finally:
+        con.close()
+
+    return options
+
+def where_clause(filters):
+    """
+    This function turns filters into a SQL WHERE clause with its parameters.
+
+    Parameters:
+    filters (dict): A list of accepted values for each categorical filter and an inclusive (low, high)
+    pair for each ranged filter; filters that are missing or None are not applied.
+
+    Returns:
+    tuple: The WHERE clause (empty when nothing is filtered) and the list of its parameters.
+    """
+    conditions, params = [], []
+    for column, value in (filters or {}).items():
+        if value is None:
+            continue
+        if column in CATEGORY_FILTERS:
+            conditions.append(f"{column} IN ({', '.join('?' * len(value))})")
+            params += list(value)
+        elif column in RANGE_FILTERS:
+            conditions.append(f"{column} BETWEEN ? AND ?")
+            params += list(value)
+        else:
+            raise ValueError(f"Unknown filter {column!r}")
+
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+def query_totals(store_path, filters=None):
+    """
+    This function sums the per-visit measures of each group over the visits matching the filters.
+    The rows without a visit have no start time, so they are not counted as sessions.
+
+    Parameters:
+    store_path (str): The path of the SQLite file.
+    filters (dict): The filters, see where_clause (default is no filter).
+
+    Returns:
+    pd.DataFrame: The number of sessions and the sums of the measures of each group, indexed by Variation.
+    """
+    where, params = where_clause(filters)
+    sums = ', '.join(f"SUM({column}) AS {column}" for column in STEP_COLUMNS)
+    query = f"""
+        SELECT Variation, COUNT(start_time) AS sessions, SUM(reached_confirm) AS confirms,
+               SUM(duration) AS duration_sum, SUM(duration * duration) AS duration_sq_sum,
+               SUM(n_events) AS n_events, SUM(backtracks) AS backtracks,
+               SUM(no_visit_rows) AS no_visit_rows, {sums}
+        FROM visits {where}
+        GROUP BY Variation
+        ORDER BY Variation
+    """
+    con = connect(store_path)
+    try:
+        return pd.read_sql_query(query, con, params=params).set_index('Variation')
+    finally:
+        con.close()
+
+def summary_from_totals(totals):
+    """
+    This function turns summed measures into the summaries of summary_vanguard.summarize,
+    so that every test of the dashboard can run on a filtered subset.
+
+    Parameters:
+    totals (pd.DataFrame): The sums of each group, from query_totals.
+
+    Returns:
+    dict: The 'completion', 'durations', 'step_dwell' and 'backtracks' DataFrames.
+    """
+    def mean_var(count, total, squares):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            var = np.maximum(squares - total * mean, 0) / (count - 1)
+        return mean, var
+
+    variations = totals.index.to_numpy()
+    duration_mean, duration_var = mean_var(totals['sessions'], totals['duration_sum'], totals['duration_sq_sum'])
+
+    steps = []
+    for step in sv.STEP_ORDER:
+        count = totals[f'events_{step}']
+        mean, var = mean_var(count, totals[f'dwell_{step}'], totals[f'dwell_sq_{step}'])
+        steps.append(pd.DataFrame({'Variation': variations, 'process_step': step,
+                                   'count': count.to_numpy(), 'mean': mean.to_numpy(), 'var': var.to_numpy()}))
+    step_dwell = pd.concat(steps, ignore_index=True).sort_values('Variation', kind='stable')
+    step_dwell = step_dwell[step_dwell['count'] > 0].reset_index(drop=True)
+    step_dwell['process_step'] = pd.Categorical(step_dwell['process_step'], categories=sv.STEP_ORDER, ordered=True)
+
+    return {
+        'completion': pd.DataFrame({'Variation': variations, 'total_sessions': totals['sessions'].to_numpy(),
+                                    'confirm_sessions': totals['confirms'].to_numpy()}),
+        'durations': pd.DataFrame({'Variation': variations, 'count': totals['sessions'].to_numpy(),
+                                   'mean': duration_mean.to_numpy(), 'var': duration_var.to_numpy()}),
+        'step_dwell': step_dwell,
+        'backtracks': pd.DataFrame({'Variation': variations, 'n_events': totals['n_events'].to_numpy(),
+                                    'backtracks': totals['backtracks'].to_numpy(),
+                                    'no_visit_rows': totals['no_visit_rows'].to_numpy() if 'no_visit_rows' in totals else 0}),
+    }
+
+def query_summary(store_path, filters=None):
+    """
+    This function builds the summaries of the visits matching the filters.
+
+    Parameters:
+    store_path (str): The path of the SQLite file.
+    filters (dict): The filters, see where_clause (default is no filter).
+
+    Returns:
+    dict: The 'completion', 'durations', 'step_dwell' and 'backtracks' DataFrames.
+    """
+    return summary_from_totals(query_totals(store_path, filters))
@@ -0,0 +1,240 @@
+import csv
+import datetime
+from collections import OrderedDict
+
+import pandas as pd
+
+import incremental_vanguard as iv
+import sessions_vanguard as sv
+
+
+# Code of each process step, in process order
+STEP_CODES = {step: code for code, step in enumerate(sv.STEP_ORDER)}
+
+# Columns of the web footprint lines, when the stream has no header
+WEB_DATA_COLUMNS = ['client_id', 'visitor_id', 'visit_id', 'process_step', 'date_time']
+
+# Most recently closed visit_ids remembered, so that late events do not reopen their visit
+CLOSED_VISITS_MAX = 100_000
+
+
+def stream_state(experiment_clients, timeout=iv.VISIT_TIMEOUT):
+    """
+    This function creates the state of a stream of web footprint events with no event yet.
+
+    A visit is closed once it has no event within the timeout. Its visit_id is remembered (the last
+    CLOSED_VISITS_MAX of them), and its later events are dropped and counted as late events instead of
+    opening a second visit. The metrics therefore match the batch analyses only when no visit has a gap
+    between two events longer than the timeout.
+
+    Parameters:
+    experiment_clients (pd.DataFrame): The experiment roster with client_id and Variation columns.
+    timeout (pd.Timedelta): The inactivity after which a visit is considered finished (default is 30 minutes).
+
+    Returns:
+    dict: The group of each client ('roster'), the visits still open keyed by visit_id in order of their
+    last event ('open_visits'), the recently closed visit_ids ('closed_visits'), the running sufficient
+    statistics ('stats') and late events ('late_events') of each group, the latest event time seen and the timeout.
+    """
+    roster = experiment_clients.dropna(subset=['Variation'])
+
+    return {
+        'roster': dict(zip(roster['client_id'].astype(str), roster['Variation'].astype(str))),
+        'timeout': timeout.to_pytimedelta(),
+        'open_visits': OrderedDict(),
+        'closed_visits': OrderedDict(),
+        'stats': {},
+        'late_events': {},
+        'latest_time': None,
+    }
+
+def close_visit(state, visit_id, visit):
+    """
+    This function adds a finished visit to the running statistics of its group and remembers its visit_id.
+
+    Parameters:
+    state (dict): The stream state.
+    visit_id (str): The visit.
+    visit (dict): The open visit, with its Variation, start_time, end_time, n_events, reached_confirm and backtracks.
+    """
+    # Remember the visit, forgetting the oldest one beyond CLOSED_VISITS_MAX
+    closed_visits = state['closed_visits']
+    closed_visits[visit_id] = None
+    if len(closed_visits) > CLOSED_VISITS_MAX:
+        closed_visits.popitem(last=False)
+
+    stats = state['stats'].setdefault(visit['Variation'], dict.fromkeys(iv.STAT_COLUMNS, 0.0))
+    duration = (visit['end_time'] - visit['start_time']).total_seconds()
+    stats['sessions'] += 1
+    stats['confirms'] += visit['reached_confirm']
+    stats['duration_sum'] += duration
+    stats['duration_sq_sum'] += duration ** 2
+    stats['events'] += visit['n_events']
+    stats['backtracks'] += visit['backtracks']
+
+def expire_visits(state, now):
+    """
+    This function closes the visits without an event within the timeout before the given time.
+    The open visits are kept in order of their last event, so only the expired ones are looked at.
+
+    Parameters:
+    state (dict): The stream state.
+    now (datetime.datetime): The current time of the stream.
+
+    Returns:
+    int: The number of visits closed.
+    """
+    open_visits, cutoff = state['open_visits'], now - state['timeout']
+    closed = 0
+    while open_visits:
+        visit_id, visit = next(iter(open_visits.items()))
+        if visit['end_time'] >= cutoff:
+            break
+        del open_visits[visit_id]
+        close_visit(state, visit_id, visit)
+        closed += 1
+
+    return closed
+
+def process_event(state, client_id, visit_id, process_step, date_time):
+    """
+    This function folds one web footprint event into the stream state in constant time: the event
+    extends its open visit (or opens one), and the visits that went quiet are closed. Events of clients
+    outside the experiment or without a visit are ignored, and events of a visit already closed are
+    counted as late events of its group.
+
+    Events are expected in roughly increasing time order; an event older than its visit's last event is
+    counted but does not move the visit back in time.
+
+    Parameters:
+    state (dict): The stream state.
+    client_id (str): The client of the event.
+    visit_id (str): The visit of the event.
+    process_step (str): The process step of the event.
+    date_time (datetime.datetime): The time of the event.
+    """
+    variation = state['roster'].get(str(client_id))
+    if variation is None or not visit_id:
+        return
+
+    step = STEP_CODES.get(process_step, -1)
+    open_visits = state['open_visits']
+    visit = open_visits.get(visit_id)
+    if visit is None and visit_id in state['closed_visits']:
+        # A late event of a closed visit
+        state['late_events'][variation] = state['late_events'].get(variation, 0) + 1
+    elif visit is None:
+        open_visits[visit_id] = {
+            'Variation': variation,
+            'start_time': date_time,
+            'end_time': date_time,
+            'n_events': 1,
+            'last_step': step,
+            'reached_confirm': step == STEP_CODES['confirm'],
+            'backtracks': 0,
+        }
+    else:
+        # Backward navigation, as in analyze_error_rates
+        visit['backtracks'] += step >= 0 and visit['last_step'] > step
+        visit['last_step'] = step
+        visit['n_events'] += 1
+        visit['reached_confirm'] |= step == STEP_CODES['confirm']
+        visit['end_time'] = max(visit['end_time'], date_time)
+        open_visits.move_to_end(visit_id)
+
+    # Close the visits that went quiet
+    if state['latest_time'] is None or date_time > state['latest_time']:
+        state['latest_time'] = date_time
+        expire_visits(state, date_time)
+
+def process_lines(state, lines, header=True):
+    """
+    This function folds a stream of web footprint lines (in the format of the df_final_web_data files)
+    into the stream state, one line at a time, e.g. from a file being written, sys.stdin or socket.makefile().
+
+    Parameters:
+    state (dict): The stream state.
+    lines (iterable of str): The lines of the stream.
+    header (bool): Whether the first line names the columns (default is True); otherwise WEB_DATA_COLUMNS.
+
+    Returns:
+    dict: The updated stream state.
+    """
+    rows = csv.reader(lines)
+    columns = next(rows, None) if header else WEB_DATA_COLUMNS
+    if columns is None:
+        return state
+    client, visit, step, time = (columns.index(name) for name in ['client_id', 'visit_id', 'process_step', 'date_time'])
+
+    for row in rows:
+        if row:
+            process_event(state, row[client], row[visit], row[step], datetime.datetime.fromisoformat(row[time]))
+
+    return state
+
+def process_queue(state, queue, header=False):
+    """
+    This function folds web footprint lines taken from a queue into the stream state until it receives None.
+
+    Parameters:
+    state (dict): The stream state.
+    queue (queue.Queue): The queue of lines, ended by None.
+    header (bool): Whether the first line names the columns (default is False).
+
+    Returns:
+    dict: The updated stream state.
+    """
+    return process_lines(state, iter(queue.get, None), header)
+
+def close_open_visits(state):
+    """
+    This function closes every visit still open, e.g. once the stream has ended.
+
+    Parameters:
+    state (dict): The stream state.
+
+    Returns:
+    dict: The stream state with no open visit left.
+    """
+    while state['open_visits']:
+        close_visit(state, *state['open_visits'].popitem(last=False))
+
+    return state
+
+def current_stats(state):
+    """
+    This function returns the running statistics of the closed visits in the format of
+    incremental_vanguard, so that its tests and sequential_vanguard.update_from_stats apply.
+
+    Parameters:
+    state (dict): The stream state.
+
+    Returns:
+    pd.DataFrame: The sufficient statistics, indexed by Variation.
+    """
+    return pd.DataFrame.from_dict(state['stats'], orient='index', columns=iv.STAT_COLUMNS,
+                                  dtype=float).rename_axis('Variation').sort_index()
+
+def current_metrics(state):
+    """
+    This function computes the completion rate, mean session duration and backtrack rate of
+    each group from the closed visits, and counts the visits still open and the late events dropped.
+
+    Parameters:
+    state (dict): The stream state.
+
+    Returns:
+    pd.DataFrame: The sessions, completion_rate (in %), mean_duration (in seconds), backtrack_rate,
+    open_visits and late_events of each group.
+    """
+    stats = current_stats(state)
+    open_counts = pd.Series([visit['Variation'] for visit in state['open_visits'].values()], dtype=object).value_counts()
+
+    return pd.DataFrame({
+        'sessions': stats['sessions'],
+        'completion_rate': stats['confirms'] / stats['sessions'] * 100,
+        'mean_duration': stats['duration_sum'] / stats['sessions'],
+        'backtrack_rate': stats['backtracks'] / stats['events'],
+        'open_visits': open_counts.reindex(stats.index, fill_value=0),
+        'late_events': pd.Series(state['late_events'], dtype=int).reindex(stats.index, fill_value=0),
+    })
@@ -0,0 +1,134 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import pyarrow as pa
+
+import analysis_vanguard as an
+import sessions_vanguard as sv
+
+
+# Columns of the per-visit table each analysis reads, so workers only convert what they use
+STEP_COLUMNS = [f'{prefix}{step}' for prefix in ('events_', 'dwell_', 'dwell_sq_') for step in sv.STEP_ORDER]
+ANALYSIS_COLUMNS = {
+    'time_spent': ['Variation'] + STEP_COLUMNS,
+    'completion': ['Variation', 'visit_id', 'reached_confirm'],
+    'cost_effectiveness': ['Variation', 'visit_id', 'client_id', 'reached_confirm', 'n_events', 'events_confirm'],
+    'completion_lift': ['Variation', 'visit_id', 'client_id', 'reached_confirm', 'n_events', 'events_confirm'],
+    'durations': ['Variation', 'duration'],
+    'durations_by_step': ['Variation'] + STEP_COLUMNS,
+    'error_rates': ['Variation', 'n_events', 'backtracks'],
+}
+
+
+def run_analysis(name, sessions, alpha=an.ALPHA, threshold=5.0, no_visit=None):
+    """
+    This function runs one analysis of the experiment report on the per-visit table.
+
+    Parameters:
+    name (str): The name of the ExperimentReport field, a key of ANALYSIS_COLUMNS.
+    sessions (pd.DataFrame): The per-visit DataFrame, with at least the columns of the analysis.
+    alpha (float): The significance level (default is 0.05).
+    threshold (float): The cost-effectiveness threshold (default is 5%).
+    no_visit (pd.Series): The rows without a visit of each client, from analysis_vanguard.no_visit_rows
+    (default is to count the events of the visits only).
+
+    Returns:
+    The typed result of the analysis.
+    """
+    if name == 'time_spent':
+        return an.time_spent(sessions)
+    if name == 'completion':
+        return an.completion_rates(sessions, alpha)
+    if name == 'cost_effectiveness':
+        return an.cost_effectiveness(sessions, an.completion_rates(sessions, alpha), threshold, alpha, no_visit)
+    if name == 'completion_lift':
+        return an.completion_lift(sessions, threshold, alpha)
+    if name == 'durations':
+        return an.session_durations(sessions, alpha)
+    if name == 'durations_by_step':
+        return an.session_durations_by_step(sessions)
+    if name == 'error_rates':
+        return an.error_rates(sessions, alpha, no_visit)
+    raise ValueError(f"Unknown analysis {name!r}")
+
+def share_table(sessions):
+    """
+    This function writes the per-visit table to a shared memory block in the Arrow IPC format,
+    which every worker can map without copying or unpickling it.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame.
+
+    Returns:
+    tuple: The shared memory block and the size of the Arrow stream in bytes.
+    """
+    table = pa.Table.from_pandas(sessions, preserve_index=False)
+
+    # Measure the stream first, then write it straight into the shared block
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    size = sink.size()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table.schema) as writer:
+        writer.write_table(table)
+
+    return shm, size
+
+def _run_shared(name, shm_name, size, alpha, threshold, no_visit):
+    """
+    This function runs one analysis in a worker process on the per-visit table of a shared memory block.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(shm.buf)[:size]).read_all()
+        sessions = table.select(ANALYSIS_COLUMNS[name]).to_pandas()
+        result = run_analysis(name, sessions, alpha, threshold, no_visit)
+
+        # Release every view of the block before closing it
+        del table, sessions
+        return result
+    finally:
+        shm.close()
+
+def run_suite(variation_df=None, sessions=None, alpha=an.ALPHA, threshold=5.0, max_workers=None, no_visit=None):
+    """
+    This function runs every hypothesis of the experiment concurrently, one analysis per task of a
+    process pool. The per-visit table is shared read-only through a shared memory block in the Arrow
+    format, so the workers map it instead of receiving a pickled copy, and only the small typed results
+    are sent back. The results are collected into the same report as analysis_vanguard.analyze_experiment.
+
+    Parameters:
+    variation_df (pd.DataFrame): The merged event DataFrame (not needed when sessions is given).
+    sessions (pd.DataFrame): The per-visit DataFrame (default is to build it from variation_df).
+    alpha (float): The significance level (default is 0.05).
+    threshold (float): The cost-effectiveness threshold (default is 5%).
+    max_workers (int): The number of processes (default is the number of CPUs; 1 runs in this process).
+    no_visit (pd.Series): The rows without a visit of each client (default is to count them in variation_df,
+    when given).
+
+    Returns:
+    ExperimentReport: The results of every hypothesis.
+    """
+    if sessions is None:
+        sessions = sv.sessionize(variation_df)
+    if no_visit is None and variation_df is not None:
+        no_visit = an.no_visit_rows(variation_df)
+
+    names = list(ANALYSIS_COLUMNS)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(names))
+    if max_workers == 1:
+        return an.ExperimentReport(**{name: run_analysis(name, sessions, alpha, threshold, no_visit) for name in names})
+
+    shm, size = share_table(sessions)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {name: executor.submit(_run_shared, name, shm.name, size, alpha, threshold, no_visit) for name in names}
+            results = {name: future.result() for name, future in futures.items()}
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return an.ExperimentReport(**results)
@@ -0,0 +1,222 @@
+import glob
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import analysis_vanguard as an
+import cache_vanguard as cv
+import sessions_vanguard as sv
+from lazy_vanguard import lazy_import
+
+# Statistics packages are imported on first use
+stats = lazy_import('scipy.stats')
+
+
+# Prefix of the summary stores in the cache directory
+SUMMARY_PREFIX = "summary_"
+
+# Tables of a summary store
+SUMMARY_TABLES = ['completion', 'durations', 'step_dwell', 'backtracks']
+
+
+def summarize(sessions, no_visit=None):
+    """
+    This function pre-aggregates the per-visit table into the small summaries the dashboard needs:
+    the session and confirm counts of each group, the count, mean and variance of the session durations
+    and of the time spent on each step, and the event, backtrack and no-visit row counts of each group.
+
+    Parameters:
+    sessions (pd.DataFrame): The per-visit DataFrame from sessions_vanguard.sessionize.
+    no_visit (pd.Series): The rows without a visit of each client, from analysis_vanguard.no_visit_rows
+    (default is none).
+
+    Returns:
+    dict: The 'completion', 'durations', 'step_dwell' and 'backtracks' DataFrames.
+    """
+    completion = an.completion_table(sessions)[['Variation', 'total_sessions', 'confirm_sessions']]
+
+    durations = sessions.groupby('Variation', observed=True)['duration'].agg(
+        count='count', mean='mean', var='var').reset_index()
+
+    step_dwell = sv.summarize_step_dwell(sessions, by='Variation')
+    step_dwell = pd.DataFrame({
+        'Variation': step_dwell['Variation'],
+        'process_step': step_dwell['process_step'].astype(str),
+        'count': step_dwell['count'],
+        'mean': step_dwell['time_spent'],
+        'var': step_dwell['std'] ** 2,
+    })
+
+    backtracks = sessions.groupby('Variation', observed=True)[['n_events', 'backtracks']].sum()
+    backtracks.index = backtracks.index.astype(str)
+    backtracks['no_visit_rows'] = 0
+    if no_visit is not None:
+        backtracks['no_visit_rows'] = an.no_visit_totals(no_visit).reindex(backtracks.index, fill_value=0)
+    backtracks = backtracks.reset_index()
+
+    summary = {'completion': completion, 'durations': durations, 'step_dwell': step_dwell, 'backtracks': backtracks}
+    for table in summary.values():
+        table['Variation'] = table['Variation'].astype(str)
+
+    return summary
+
+def summary_path_for(key, cache_dir=cv.CACHE_DIR):
+    """
+    This function returns the path of the summary store for a content hash of the source files.
+
+    Parameters:
+    key (str): The content hash of the source files.
+    cache_dir (str): The directory of the columnar cache.
+
+    Returns:
+    str: The path of the SQLite file.
+    """
+    return os.path.join(cache_dir, f"{SUMMARY_PREFIX}{key}.sqlite")
+
+def write_summary(summary, file_paths, cache_dir=cv.CACHE_DIR, key=None):
+    """
+    This function writes the summaries to a small SQLite file, one table per summary.
+
+    Parameters:
+    summary (dict): The summaries, from summarize.
+    file_paths (list of str): The paths of the source files the summaries were built from.
+    cache_dir (str): The directory of the columnar cache.
+    key (str): The content hash of the source files, from cache_vanguard.hash_source_files (default is to compute it).
+
+    Returns:
+    str: The path of the written SQLite file.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    summary_path = summary_path_for(key or cv.hash_source_files(file_paths), cache_dir)
+
+    # Write to a temporary file first so readers never see a half-written store
+    tmp_path = summary_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    con = sqlite3.connect(tmp_path)
+    try:
+        for name in SUMMARY_TABLES:
+            summary[name].to_sql(name, con, index=False)
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp_path, summary_path)
+
+    return summary_path
+
+def read_summary(summary_path):
+    """
+    This function reads the summaries of a summary store.
+
+    Parameters:
+    summary_path (str): The path of the SQLite file.
+
+    Returns:
+    dict: The 'completion', 'durations', 'step_dwell' and 'backtracks' DataFrames.
+    """
+    con = sqlite3.connect(f"file:{summary_path}?mode=ro", uri=True)
+    try:
+        summary = {name: pd.read_sql_query(f"SELECT * FROM {name}", con) for name in SUMMARY_TABLES}
+    finally:
+        con.close()
+
+    # Restore the order of the process steps
+    step_dwell = summary['step_dwell']
+    step_dwell['process_step'] = pd.Categorical(step_dwell['process_step'], categories=sv.STEP_ORDER, ordered=True)
+
+    return summary
+
+def latest_summary_path(cache_dir=cv.CACHE_DIR):
+    """
+    This function finds the most recently written summary store.
+
+    Parameters:
+    cache_dir (str): The directory of the columnar cache.
+
+    Returns:
+    str or None: The path of the SQLite file, or None if there is none.
+    """
+    summary_paths = glob.glob(os.path.join(cache_dir, f"{SUMMARY_PREFIX}*.sqlite"))
+    if not summary_paths:
+        return None
+
+    return max(summary_paths, key=os.path.getmtime)
+
+def completion_rates(summary, alpha=an.ALPHA):
+    """
+    This function performs the z-test of analysis_vanguard.completion_rates from the summaries.
+
+    Parameters:
+    summary (dict): The summaries.
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    CompletionResult: The completion data and the z-test results.
+    """
+    completion_data = summary['completion'].copy()
+    completion_data['completion_rate'] = (completion_data['confirm_sessions'] / completion_data['total_sessions']) * 100
+
+    return an.completion_test(completion_data, alpha)
+
+def session_durations(summary, alpha=an.ALPHA):
+    """
+    This function performs the t-test of analysis_vanguard.session_durations (Test sessions longer
+    than Control sessions) from the count, mean and variance of the durations.
+
+    Parameters:
+    summary (dict): The summaries.
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    DurationResult: The mean durations and the t-test results.
+    """
+    durations = summary['durations'].set_index('Variation')
+    control, test = durations.loc['Control'], durations.loc['Test']
+
+    t_stat, p_value = stats.ttest_ind_from_stats(test['mean'], np.sqrt(test['var']), test['count'],
+                                                 control['mean'], np.sqrt(control['var']), control['count'],
+                                                 alternative='greater')
+
+    return an.DurationResult(control['mean'], test['mean'], t_stat, p_value, alpha)
+
+def session_durations_by_step(summary):
+    """
+    This function performs the Welch t-tests of analysis_vanguard.session_durations_by_step from the
+    count, mean and variance of the time spent on each step.
+
+    Parameters:
+    summary (dict): The summaries.
+
+    Returns:
+    StepDurationResult: The per-group step statistics and the t-test results for each process step.
+    """
+    step_dwell = summary['step_dwell']
+    step_summary = pd.DataFrame({
+        'Variation': step_dwell['Variation'],
+        'process_step': step_dwell['process_step'],
+        'count': step_dwell['count'],
+        'time_spent': step_dwell['mean'],
+        'std': np.sqrt(step_dwell['var']),
+    })
+
+    return an.step_duration_tests(step_summary)
+
+def error_rates(summary, alpha=an.ALPHA):
+    """
+    This function performs the chi-square test of analysis_vanguard.error_rates from the event
+    and backtrack counts, counting the rows without a visit as events without backward navigation.
+
+    Parameters:
+    summary (dict): The summaries.
+    alpha (float): The significance level (default is 0.05).
+
+    Returns:
+    ErrorRateResult: The error rates, the contingency table and the chi-square test results.
+    """
+    counts = summary['backtracks'].set_index('Variation')
+    if 'no_visit_rows' in counts:
+        counts = counts.assign(n_events=counts['n_events'] + counts['no_visit_rows'])
+
+    return an.error_rate_test(counts[['n_events', 'backtracks']], alpha)
@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 from vanguardbackend import analyze_control_group
 
 def import_dataframe(file_path):
@@ -12,7 +11,9 @@ def main():
     st.title('Vanguard New Website Test')
     st.subheader("_Streamlit_ is :blue[cool] :sunglasses:")
     df = import_dataframe('variation.csv')
-    analyze_control_group(df)
+    control_df, figures = analyze_control_group(df)
+    for fig in figures:
+        st.pyplot(fig)
 
 
 if __name__ == '__main__':
@@ -1,55 +1,172 @@
+import os
+import sys
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from statsmodels.stats.proportion import proportions_ztest
-from scipy import stats
-from scipy.stats import ttest_ind, chi2_contingency
+
+# Make the pipeline modules importable from the dashboard
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Py files'))
+import analysis_vanguard as an
+import cache_vanguard as cv
+import sessions_vanguard as sv
+import store_vanguard as vs
+import summary_vanguard as sm
+
+# Cached results are kept for an hour, for a few datasets at most
+CACHE_TTL = 3600
+CACHE_MAX_ENTRIES = 8
+
+# Filtered summaries are kept for more combinations of filters
+FILTER_CACHE_MAX_ENTRIES = 256
+
+# Labels of the categorical filters
+CATEGORY_FILTER_LABELS = {'client_status': 'Client status', 'age_group': 'Age group', 'gendr': 'Gender'}
 
 # Function to import dataframe
 def import_dataframe(file_path):
-    df = pd.read_csv(file_path)
+    # Memory-map the pipeline's columnar cache when it exists, else parse the CSV
+    df = cv.read_latest_variation_cache()
+    if df is None:
+        df = pd.read_csv(file_path, parse_dates=['date_time'])
     return df
 
+def dataset_fingerprint(file_path):
+    """
+    This function identifies the dataset the dashboard would load, without reading it.
+
+    Parameters:
+    file_path (str): The path of the CSV file used when the pipeline has not written any store.
 
-def analyze_completion_rates(variation_df):
+    Returns:
+    str: The name of the latest summary store or columnar cache file, which holds the content hash
+    of the source files, or else the path, size and modification time of the CSV file.
     """
-    This function calculates the completion rates for each group, performs a z-test to compare the completion rates
-    between the control and test groups, and plots the results.
+    store_path = sm.latest_summary_path() or cv.latest_variation_cache_path()
+    if store_path is not None:
+        return os.path.basename(store_path)
+
+    file_stat = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}:{file_stat.st_size}:{file_stat.st_mtime_ns}"
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def load_summary(file_path, fingerprint):
+    """
+    This function loads the pre-aggregated summaries once per fingerprint and shares them between
+    all sessions and reruns. The summaries are read from the pipeline's summary store, so loading
+    does not depend on the number of events; without a store they are built once from the full dataset.
 
     Parameters:
-    variation_df (pd.DataFrame): The DataFrame containing the process steps and variation labels.
+    file_path (str): The path of the CSV file used when the pipeline has not written any store.
+    fingerprint (str): The fingerprint of the dataset, from dataset_fingerprint.
 
     Returns:
-    pd.DataFrame: A DataFrame containing the completion data and the z-test results.
+    dict: The summaries, from summary_vanguard.summarize.
+    """
+    summary_path = sm.latest_summary_path()
+    if summary_path is not None:
+        return sm.read_summary(summary_path)
+
+    variation_df = import_dataframe(file_path)
+    return sm.summarize(sv.sessionize(variation_df), an.no_visit_rows(variation_df))
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def load_filter_options(store_path, fingerprint):
+    """
+    This function reads the values and bounds of the filter dimensions from the visit store.
+
+    Parameters:
+    store_path (str): The path of the visit store.
+    fingerprint (str): The fingerprint of the dataset, from dataset_fingerprint.
+
+    Returns:
+    dict: A list of values for each categorical filter and a (low, high) pair for each ranged filter.
+    """
+    return vs.filter_options(store_path)
+
+def sidebar_filters(options):
+    """
+    This function shows the drill-down filters in the sidebar. Filters left at their full range are not applied.
+
+    Parameters:
+    options (dict): The values and bounds of the filter dimensions, from load_filter_options.
+
+    Returns:
+    dict: The filters, in the format of store_vanguard.where_clause.
+    """
+    st.sidebar.header("Filters")
+    filters = {}
+
+    for column, label in CATEGORY_FILTER_LABELS.items():
+        selected = st.sidebar.multiselect(label, options[column], default=options[column])
+        filters[column] = tuple(selected) if len(selected) < len(options[column]) else None
+
+    low, high = options['total_tenure_months']
+    tenure = st.sidebar.slider("Tenure (months)", int(low), int(high), (int(low), int(high)))
+    filters['total_tenure_months'] = tenure if tenure != (int(low), int(high)) else None
+
+    low, high = options['bal']
+    balance = st.sidebar.slider("Balance", float(low), float(high), (float(low), float(high)))
+    filters['bal'] = balance if balance != (float(low), float(high)) else None
+
+    # Visits are filtered on the day they started
+    first_day = pd.Timestamp(options['start_time'][0], unit='s').date()
+    last_day = pd.Timestamp(options['start_time'][1], unit='s').date()
+    days = st.sidebar.date_input("Visit dates", (first_day, last_day), min_value=first_day, max_value=last_day)
+    filters['start_time'] = None
+    if len(days) == 2 and tuple(days) != (first_day, last_day):
+        start = int(pd.Timestamp(days[0]).timestamp())
+        end = int((pd.Timestamp(days[1]) + pd.Timedelta(days=1)).timestamp()) - 1
+        filters['start_time'] = (start, end)
+
+    return {column: value for column, value in filters.items() if value is not None}
+
+@st.cache_data(max_entries=FILTER_CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def query_filtered_summary(store_path, fingerprint, filters):
     """
-    # Total number of sessions for each group
-    total_sessions = variation_df.groupby('Variation')['visit_id'].nunique().reset_index(name='total_sessions')
+    This function builds the summaries of the visits matching the filters from the indexed visit store.
+    Results are memoized on the dataset fingerprint and the filters.
 
-    # Filter the data to only include rows where process_step is "confirm"
-    confirm_steps = variation_df[variation_df['process_step'] == 'confirm']
+    Parameters:
+    store_path (str): The path of the visit store.
+    fingerprint (str): The fingerprint of the dataset, from dataset_fingerprint.
+    filters (dict): The filters, from sidebar_filters.
 
-    # Count the number of sessions that reached the "confirm" step for each group
-    confirm_sessions = confirm_steps.groupby('Variation')['visit_id'].nunique().reset_index(name='confirm_sessions')
+    Returns:
+    dict: The summaries, in the format of summary_vanguard.summarize.
+    """
+    return vs.query_summary(store_path, filters)
 
-    # Merge total sessions with confirm sessions
-    completion_data = pd.merge(total_sessions, confirm_sessions, on='Variation')
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def compute_completion_rates(fingerprint, _summary):
+    """
+    This function calculates the completion rates for each group and performs a z-test to compare the completion rates
+    between the control and test groups. Results are memoized on the dataset fingerprint.
 
-    # Calculate the completion rate
-    completion_data['completion_rate'] = (completion_data['confirm_sessions'] / completion_data['total_sessions']) * 100
+    Parameters:
+    fingerprint (str): The fingerprint of the dataset, from dataset_fingerprint.
+    _summary (dict): The pre-aggregated summaries (not hashed).
 
-    # Extract data for z-test
-    control_successes = completion_data[completion_data['Variation'] == 'Control']['confirm_sessions'].values[0]
-    control_total = completion_data[completion_data['Variation'] == 'Control']['total_sessions'].values[0]
+    Returns:
+    tuple: The completion data, the z-statistic and the p-value.
+    """
+    result = sm.completion_rates(_summary)
+    return result.completion_data, result.z_stat, result.p_value
 
-    test_successes = completion_data[completion_data['Variation'] == 'Test']['confirm_sessions'].values[0]
-    test_total = completion_data[completion_data['Variation'] == 'Test']['total_sessions'].values[0]
+def analyze_completion_rates(summary, fingerprint):
+    """
+    This function shows the completion rates for each group, the z-test comparing the completion rates
+    between the control and test groups, and plots the results.
 
-    # Perform z-test for proportions
-    count = [control_successes, test_successes]
-    nobs = [control_total, test_total]
+    Parameters:
+    summary (dict): The pre-aggregated summaries.
+    fingerprint (str): The fingerprint of the dataset, from dataset_fingerprint.
 
-    z_stat, p_value = proportions_ztest(count, nobs)
+    Returns:
+    pd.DataFrame: A DataFrame containing the completion data and the z-test results.
+    """
+    completion_data, z_stat, p_value = compute_completion_rates(fingerprint, summary)
 
     # Check if the difference is statistically significant
     alpha = 0.05
@@ -71,36 +188,52 @@ def analyze_completion_rates(variation_df):
 
     return completion_data, z_stat, p_value
 
-def analyze_session_durations_by_step(variation_df):
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def compute_session_durations_by_step(fingerprint, _summary):
+    """
+    This function calculates the session durations by step for both control and test groups and
+    performs Welch's t-tests, exactly, from the count, mean and variance of each group and step.
+    Results are memoized on the dataset fingerprint.
+
+    Parameters:
+    fingerprint (str): The fingerprint of the dataset, from dataset_fingerprint.
+    _summary (dict): The pre-aggregated summaries (not hashed).
+
+    Returns:
+    tuple: The average time spent on each step of the Control group, of the Test group, of both groups,
+    and the t-test results for each process step.
+    """
+    result = sm.session_durations_by_step(_summary)
+    combined_df = result.step_summary[['process_step', 'time_spent', 'Variation']]
+
+    # Order the process steps correctly (in process order, whether the summaries hold strings or categories)
+    combined_df = combined_df.assign(
+        process_step=pd.Categorical(combined_df['process_step'], categories=sv.STEP_ORDER, ordered=True))
+    combined_df = combined_df.sort_values(['process_step', 'Variation']).reset_index(drop=True)
+    time_spent_summary_control = combined_df[combined_df['Variation'] == 'Control'].reset_index(drop=True)
+    time_spent_summary_test = combined_df[combined_df['Variation'] == 'Test'].reset_index(drop=True)
+
+    return time_spent_summary_control, time_spent_summary_test, combined_df, result.ttest_results
+
+def analyze_session_durations_by_step(summary, fingerprint):
     """
-    This function analyzes the session durations by step for both control and test groups,
-    performs t-tests to compare the durations, and plots the results.
+    This function shows the session durations by step for both control and test groups,
+    the t-tests comparing the durations, and plots the results.
 
     Parameters:
-    variation_df (pd.DataFrame): The DataFrame containing the process steps and variation labels.
+    summary (dict): The pre-aggregated summaries.
+    fingerprint (str): The fingerprint of the dataset, from dataset_fingerprint.
 
     Returns:
     pd.DataFrame: A DataFrame containing the t-test results for each process step.
     """
-    # Calculate average time spent on each step for the Control group
-    time_spent_summary_control = variation_df[variation_df['Variation'] == 'Control'].groupby('process_step')['time_spent'].mean().reset_index()
-    time_spent_summary_control['Variation'] = 'Control'
+    time_spent_summary_control, time_spent_summary_test, combined_df, ttest_results_df = \
+        compute_session_durations_by_step(fingerprint, summary)
+
     st.write("Average Time Spent on Each Step (Control Group):")
     st.write(time_spent_summary_control)
-    
-    # Calculate average time spent on each step for the Test group
-    time_spent_summary_test = variation_df[variation_df['Variation'] == 'Test'].groupby('process_step')['time_spent'].mean().reset_index()
-    time_spent_summary_test['Variation'] = 'Test'
     st.write("Average Time Spent on Each Step (Test Group):")
     st.write(time_spent_summary_test)
-    
-    # Combine both dataframes
-    combined_df = pd.concat([time_spent_summary_control, time_spent_summary_test])
-
-    # Order the process steps correctly
-    step_order = ['start', 'step_1', 'step_2', 'step_3', 'confirm']
-    combined_df['process_step'] = pd.Categorical(combined_df['process_step'], categories=step_order, ordered=True)
-    combined_df = combined_df.sort_values('process_step').reset_index(drop=True)
     st.write("Combined DataFrame:")
     st.write(combined_df)
     
@@ -121,35 +254,6 @@ def analyze_session_durations_by_step(variation_df):
     # Show plot
     st.pyplot(fig)
     
-    # Initialize list to store results
-    results = []
-    
-    # Perform t-test for each process step
-    for step in step_order:
-        control_times = variation_df[(variation_df['Variation'] == 'Control') & (variation_df['process_step'] == step)]['time_spent']
-        test_times = variation_df[(variation_df['Variation'] == 'Test') & (variation_df['process_step'] == step)]['time_spent']
-        
-        if not control_times.empty and not test_times.empty:
-            t_stat, p_value = ttest_ind(control_times, test_times, equal_var=False)
-            results.append({
-                'process_step': step,
-                'control_mean': control_times.mean(),
-                'test_mean': test_times.mean(),
-                't_stat': t_stat,
-                'p_value': p_value
-            })
-        else:
-            results.append({
-                'process_step': step,
-                'control_mean': control_times.mean() if not control_times.empty else None,
-                'test_mean': test_times.mean() if not test_times.empty else None,
-                't_stat': None,
-                'p_value': None
-            })
-    
-    # Convert results to DataFrame
-    ttest_results_df = pd.DataFrame(results)
-    
     # Display the t-test results
     st.write("T-test Results for Each Process Step:")
     st.write(ttest_results_df)
@@ -158,13 +262,14 @@ def analyze_session_durations_by_step(variation_df):
 
 
 
-def analyze_error_rates(df):
-    df = df.sort_values(by=['client_id', 'visit_id', 'date_time'])
-    step_mapping = { 'start': 0, 'step_1': 1, 'step_2': 2, 'step_3': 3, 'confirm': 4 }
-    df['step_index'] = df['process_step'].map(step_mapping)
-    df['prev_step_index'] = df.groupby('visit_id')['step_index'].shift(1)
-    df['is_back_track'] = df['prev_step_index'] > df['step_index']
-    error_rates = df.groupby('Variation')['is_back_track'].mean().reset_index(name='Error Rate')
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+def compute_error_rates(fingerprint, _summary):
+    # Chi-square test on the event and backtrack counts, memoized on the dataset fingerprint
+    result = sm.error_rates(_summary)
+    return result.error_rates, result.chi2, result.p_value
+
+def analyze_error_rates(summary, fingerprint):
+    error_rates, chi2, p = compute_error_rates(fingerprint, summary)
 
     fig, ax = plt.subplots(figsize=(10, 6))
     sns.barplot(x='Variation', y='Error Rate', data=error_rates, palette=['skyblue', 'red'], ax=ax)
@@ -173,8 +278,6 @@ def analyze_error_rates(df):
     ax.set_ylabel('Error Rate')
     st.pyplot(fig)
 
-    contingency_table = pd.crosstab(df['Variation'], df['is_back_track'])
-    chi2, p, dof, ex = chi2_contingency(contingency_table)
     st.write(f"Chi-Square Test:\nChi2: {chi2}\np-value: {p}")
 
     return error_rates, chi2, p
@@ -183,22 +286,38 @@ def analyze_error_rates(df):
 def main():
     st.title("Vanguard A/B Testing Results")
 
-    # Directly import dataframe using a file path
-    df = import_dataframe('variation.csv')
-    st.write(df.head())
+    # Load the pre-aggregated summaries once per dataset; results below are only recomputed when it changes
+    fingerprint = dataset_fingerprint('variation.csv')
+    store_path = vs.latest_store_path()
+    filters = {}
+    if store_path is not None:
+        filters = sidebar_filters(load_filter_options(store_path, fingerprint))
+
+    if filters:
+        # Drill down on the visits matching the filters of the sidebar
+        summary = query_filtered_summary(store_path, fingerprint, filters)
+        fingerprint = f"{fingerprint}|{sorted(filters.items())}"
+    else:
+        # Without filters the summary store already holds the summaries, whatever the number of visits
+        summary = load_summary('variation.csv', fingerprint)
+
+    # Every test compares the two groups
+    if not {'Control', 'Test'} <= set(summary['completion']['Variation']):
+        st.warning("No visits of both the Control and Test groups match the filters.")
+        return
 
     # Analyze completion rates
     st.header("Analyze Completion Rates")
-    completion_data, z_stat, p_value = analyze_completion_rates(df)
+    completion_data, z_stat, p_value = analyze_completion_rates(summary, fingerprint)
     st.write(completion_data)
 
     # Analyze session durations by step
     st.header("Analyze Session Durations by Step")
-    analyze_session_durations_by_step(df)
+    analyze_session_durations_by_step(summary, fingerprint)
 
     # Analyze error rates
     st.header("Analyze Error Rates")
-    error_rates, chi2, p = analyze_error_rates(df)
+    error_rates, chi2, p = analyze_error_rates(summary, fingerprint)
     st.write(error_rates)
 
 if __name__ == "__main__":